@@ -0,0 +1,114 @@
+'''
+Description: Latency/accuracy tradeoff of trimming Whisper's 30 s padding.
+Transcribes every .wav in a directory with the full 30 s window and with
+each bucket size. Reports the mean encoder time, the mean total transcription
+time and the word error rate. A clip is scored against a .txt transcript
+next to it with the same name when one exists; otherwise it is scored
+against the full-window output.
+
+    python -m benchmarks.whisper_padding recordings/clips --model medium --buckets 2,4,8
+'''
+
+import argparse
+import glob
+import os
+import re
+import time
+
+import numpy as np
+import whisper
+
+from core.stt.whisper_stt import WhisperSTT
+
+
+def normalize(text):
+    return re.sub(r"[^\w\s]", " ", text.lower()).split()
+
+
+def word_error_rate(reference, hypothesis):
+    """Word-level Levenshtein distance divided by the reference length."""
+    ref, hyp = normalize(reference), normalize(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    distances = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        previous, distances[0] = distances[0], i
+        for j, hyp_word in enumerate(hyp, 1):
+            previous, distances[j] = distances[j], min(
+                distances[j] + 1,
+                distances[j - 1] + 1,
+                previous + (ref_word != hyp_word)
+            )
+    return distances[-1] / len(ref)
+
+
+def run_setting(stt, clips, repeats):
+    """Transcribe every clip; returns mean (encode seconds, total seconds) over clips and the texts.
+
+    Each clip is run `repeats` times and its fastest run is kept.
+    """
+    encode_times, total_times, texts = [], [], []
+    for audio in clips:
+        best_encode, best_total = float("inf"), float("inf")
+        for _ in range(repeats):
+            stt.reset_language()
+            start = time.perf_counter()
+            stt.encode_audio(audio)
+            best_encode = min(best_encode, time.perf_counter() - start)
+
+            stt.reset_language()
+            start = time.perf_counter()
+            text = stt.transcribe_audio(audio)
+            best_total = min(best_total, time.perf_counter() - start)
+        encode_times.append(best_encode)
+        total_times.append(best_total)
+        texts.append(text)
+    return np.mean(encode_times), np.mean(total_times), texts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("clips", type=str, help="directory of .wav clips, optionally with .txt transcripts")
+    parser.add_argument("--model", type=str, default="medium")
+    parser.add_argument("--buckets", type=str, default="2,4,8,15", help="bucket sizes in seconds")
+    parser.add_argument("--repeats", type=int, default=3, help="runs per clip; the fastest is kept")
+    parser.add_argument("--num-threads", type=int, default=None)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.clips, "*.wav")))
+    if not paths:
+        raise SystemExit(f"No .wav files in {args.clips}")
+    clips = [whisper.load_audio(path) for path in paths]
+    references = []
+    for path in paths:
+        transcript = os.path.splitext(path)[0] + ".txt"
+        if os.path.exists(transcript):
+            with open(transcript, encoding="utf-8") as f:
+                references.append(f.read())
+        else:
+            references.append(None)
+    durations = [len(audio) / whisper.audio.SAMPLE_RATE for audio in clips]
+    print(f"{len(clips)} clips, {np.mean(durations):.1f}s mean duration")
+
+    stt = WhisperSTT(args.model, num_threads=args.num_threads)
+    # Warm up so the first setting does not pay for lazy initialization
+    stt.transcribe_audio(clips[0])
+
+    full_encode, full_total, full_texts = run_setting(stt, clips, args.repeats)
+    references = [ref if ref is not None else text for ref, text in zip(references, full_texts)]
+    settings = [("full", full_encode, full_total, full_texts)]
+
+    stt.pad_mode = "bucket"
+    for bucket in args.buckets.split(","):
+        stt.bucket_seconds = float(bucket)
+        settings.append((f"{bucket}s", *run_setting(stt, clips, args.repeats)))
+
+    print(f"\n{'window':>8} {'encode ms':>10} {'total ms':>10} {'speedup':>8} {'WER':>7}")
+    for name, encode_time, total_time, texts in settings:
+        wer = np.mean([word_error_rate(ref, text) for ref, text in zip(references, texts)])
+        print(f"{name:>8} {encode_time * 1000:>10.1f} {total_time * 1000:>10.1f} "
+              f"{full_total / total_time:>7.2f}x {wer * 100:>6.1f}%")
+
+
+if __name__ == "__main__":
+    main()
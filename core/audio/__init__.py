@@ -0,0 +1,3 @@
+"""
+Audio capture, playback and buffering utilities for the AI Recruiter application.
+"""
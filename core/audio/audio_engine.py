@@ -0,0 +1,116 @@
+'''
+Description: Long-lived audio I/O engine shared by every component that
+records or plays sound.
+The engine opens one input stream and one output stream when the pipeline
+starts and keeps them open for the whole interview. Captured blocks are fanned
+out to input listeners (the recorder, the interrupt detector) and each output
+block is filled from the registered output sources (the TTS player), so
+nothing is reopened between sentences or turns.
+
+Capture runs at 16 kHz for Whisper while Google TTS produces 24 kHz audio, and
+a PortAudio duplex stream only supports a single sample rate, so the engine
+owns two streams rather than one sd.Stream.
+'''
+
+import threading
+import sounddevice as sd
+
+
+def parse_device(value):
+    """Interpret a device setting from the environment as an index, a name or the default."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, int) or not value.isdigit():
+        return value
+    return int(value)
+
+
+class AudioEngine:
+    def __init__(self, input_device=1, output_device=None, input_rate=16000, output_rate=24000,
+                 input_blocksize=256, output_blocksize=480):
+        self.input_device = parse_device(input_device)
+        self.output_device = parse_device(output_device)
+        self.input_rate = input_rate
+        self.output_rate = output_rate
+        self.input_blocksize = input_blocksize  # 16 ms at 16 kHz keeps barge-in reaction under 100 ms
+        self.output_blocksize = output_blocksize
+
+        # Callbacks read these tuples without locking; writers replace them whole
+        self.input_listeners = ()
+        self.output_sources = ()
+        self.lock = threading.Lock()
+
+        self.input_stream = None
+        self.output_stream = None
+
+    def start(self):
+        """Open and start both streams. Calling it again is a no-op."""
+        with self.lock:
+            if self.input_stream is None:
+                self.input_stream = sd.InputStream(
+                    samplerate=self.input_rate,
+                    channels=1,
+                    blocksize=self.input_blocksize,
+                    device=self.input_device,
+                    callback=self.input_callback
+                )
+                self.input_stream.start()
+            if self.output_stream is None:
+                self.output_stream = sd.OutputStream(
+                    samplerate=self.output_rate,
+                    channels=1,
+                    blocksize=self.output_blocksize,
+                    device=self.output_device,
+                    callback=self.output_callback
+                )
+                self.output_stream.start()
+
+    def close(self):
+        """Stop and close both streams."""
+        with self.lock:
+            for stream in (self.input_stream, self.output_stream):
+                if stream is not None:
+                    stream.stop()
+                    stream.close()
+            self.input_stream = None
+            self.output_stream = None
+
+    @property
+    def output_latency(self):
+        """Seconds between filling an output block and it being heard."""
+        return self.output_stream.latency if self.output_stream is not None else 0.0
+
+    def add_input_listener(self, listener):
+        """Register `listener(block)` to receive every captured mono float32 block.
+
+        The block is a view on PortAudio's buffer and is only valid during the call.
+        """
+        with self.lock:
+            self.input_listeners = self.input_listeners + (listener,)
+
+    def remove_input_listener(self, listener):
+        with self.lock:
+            self.input_listeners = tuple(l for l in self.input_listeners if l != listener)
+
+    def add_output_source(self, source):
+        """Register a source whose `fill(out)` method mixes audio into each output block."""
+        with self.lock:
+            self.output_sources = self.output_sources + (source,)
+
+    def remove_output_source(self, source):
+        with self.lock:
+            self.output_sources = tuple(s for s in self.output_sources if s is not source)
+
+    def input_callback(self, indata, frames, time_info, status):
+        if status:
+            print(status)  # Print any sounddevice errors/warnings
+        block = indata[:, 0]
+        for listener in self.input_listeners:
+            listener(block)
+
+    def output_callback(self, outdata, frames, time_info, status):
+        if status:
+            print(f"Playback status: {status}")
+        outdata.fill(0)
+        for source in self.output_sources:
+            source.fill(outdata[:, 0])
@@ -0,0 +1,146 @@
+'''
+Description: Echo-aware barge-in detection for half-duplex playback.
+The agent's own voice reaches the microphone through the speaker, so a plain
+level threshold interrupts the agent with its own echo. BargeInDetector is a
+VoiceActivityDetector whose speech threshold also covers the echo. It
+estimates the echo from the level of what was actually sent to the speaker,
+recorded by a PlaybackReference output source, scaled by an echo gain that
+it learns while only the agent is talking. The candidate counts as barging
+in once their speech stays above both the noise floor and the expected echo
+for onset_frames frames.
+
+The detector keeps the microphone audio from just before the onset. The
+recorder takes it with take(), so the next turn's STT hears the interruption
+from its first word.
+'''
+
+import collections
+import threading
+import time
+
+import numpy as np
+
+from core.audio.ring_buffer import AudioRingBuffer
+from core.audio.vad import VoiceActivityDetector
+
+
+class PlaybackReference:
+    """Output source that records the level of every block sent to the speaker.
+
+    Register it after the players: it reads the mixed block and adds nothing to it.
+    """
+
+    def __init__(self, history=1.0):
+        self.history = history  # Seconds of levels kept
+        self.levels = collections.deque()  # (time, rms) pairs, oldest first
+        self.lock = threading.Lock()
+
+    def fill(self, out):
+        now = time.monotonic()
+        rms = float(np.sqrt(np.mean(np.square(out, dtype=np.float32)))) if len(out) else 0.0
+        with self.lock:
+            self.levels.append((now, rms))
+            while self.levels and now - self.levels[0][0] > self.history:
+                self.levels.popleft()
+
+    def level(self, window):
+        """Loudest playback block of the last `window` seconds."""
+        since = time.monotonic() - window
+        with self.lock:
+            return max((rms for t, rms in self.levels if t >= since), default=0.0)
+
+
+class BargeInDetector(VoiceActivityDetector):
+    def __init__(self, reference, sample_rate=16000, on_barge_in=None, echo_gain=1.0, echo_margin=2.0,
+                 echo_tail=0.3, echo_adapt=0.05, max_echo_gain=1.5, min_reference_level=0.005, onset_frames=4,
+                 preroll=0.5, max_capture=30.0, **kwargs):
+        """
+        Args:
+            reference: PlaybackReference fed by the output stream
+            on_barge_in: Called from the audio callback when the candidate starts talking
+            echo_gain: Initial ratio of microphone level to playback level for pure echo
+            echo_margin: Speech must be this many times louder than the expected echo
+            echo_tail: Seconds of playback that can still be echoing (output latency plus room)
+            echo_adapt: Rate at which echo_gain follows frames that contain only echo
+            max_echo_gain: Upper bound on the learned echo_gain, so the threshold cannot run away
+            min_reference_level: Playback quieter than this is treated as silence
+            onset_frames: Consecutive speech frames needed; 4 frames of 256 samples is 64 ms
+            preroll: Seconds kept from before the onset for the next turn's STT
+            max_capture: Seconds of barge-in audio kept until take() is called
+        """
+        self.reference = reference
+        self.on_barge_in = on_barge_in
+        self.echo_gain = echo_gain
+        self.echo_margin = echo_margin
+        self.echo_tail = echo_tail
+        self.echo_adapt = echo_adapt
+        self.max_echo_gain = max_echo_gain
+        self.min_reference_level = min_reference_level
+        self.preroll = int(preroll * sample_rate)
+        self.capture = AudioRingBuffer(int(max_capture * sample_rate) + self.preroll)
+        self.lock = threading.Lock()
+        super().__init__(sample_rate=sample_rate, onset_frames=onset_frames, likely_end_silence=None, **kwargs)
+
+    def reset(self):
+        # echo_gain is kept: the acoustic path does not change between responses
+        super().reset()
+        self.capture.reset()
+        self.onset_sample = None
+        self.forward = None  # Listener the recorder handed over in take()
+
+    def is_speech_frame(self, rms):
+        """Speech must clear the noise floor and the echo expected from recent playback."""
+        if self.noise_floor is None:
+            # Detection usually starts with echo already present, which must not seed the floor
+            self.noise_floor = self.min_speech_level / self.snr_ratio
+        playback = self.reference.level(self.echo_tail)
+        echo = self.echo_gain * playback if playback > self.min_reference_level else 0.0
+        is_speech = rms > max(self.noise_floor * self.snr_ratio, self.min_speech_level, echo * self.echo_margin)
+        if is_speech:
+            return True
+        if rms < self.noise_floor:
+            self.noise_floor += self.noise_attack * (rms - self.noise_floor)
+        elif not echo:
+            # Echo must not raise the floor; only room noise may
+            self.noise_floor += self.noise_release * (rms - self.noise_floor)
+        if echo > self.noise_floor * self.snr_ratio:
+            # The expected echo dominates room noise, so this frame is mostly the agent: learn how much of
+            # the playback reaches the microphone. Bounded, so soft speech cannot talk the threshold up.
+            gain = self.echo_gain + self.echo_adapt * (rms / playback - self.echo_gain)
+            self.echo_gain = min(gain, self.max_echo_gain)
+        return False
+
+    def check_end(self):
+        # The detector runs for as long as the agent is speaking; the recorder's VAD ends the utterance
+        return False
+
+    def listen(self, block):
+        """Input listener: detect the onset, then keep capturing until the recorder takes over."""
+        with self.lock:
+            forward = self.forward
+            if forward is None:
+                self.capture.write(block)
+                if not self.speech_started.is_set():
+                    self.process(block)
+                    if self.speech_started.is_set():
+                        self.onset_sample = max(self.capture.oldest, self.capture.total_written - self.preroll)
+                        if self.on_barge_in is not None:
+                            self.on_barge_in()
+        if forward is not None:
+            forward(block)
+
+    def take(self, listener):
+        """Hand the barge-in audio and all later blocks to `listener`.
+
+        The captured audio is passed to `listener` first, under the same lock as
+        live blocks, so nothing is lost or reordered at the handover.
+
+        Returns:
+            bool: True if there was a barge-in to hand over
+        """
+        with self.lock:
+            if self.onset_sample is None:
+                return False
+            listener(self.capture.read(self.onset_sample))
+            self.forward = listener
+            return True
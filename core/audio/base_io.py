@@ -0,0 +1,42 @@
+# Description: This file contains the abstract class for the async audio transport used by the conversation engine.
+
+from abc import ABC, abstractmethod
+import numpy as np
+
+class BaseAudioIO(ABC):
+    # Sample rate of the blocks returned by read_block
+    input_rate = 16000
+    # PlaybackReference of what reaches a local speaker, for echo-aware barge-in.
+    # None when the input carries no echo of our playback (headset, or the client cancels it).
+    reference = None
+
+    def start(self):
+        """Called from the running event loop before the first read_block."""
+        pass
+
+    @abstractmethod
+    async def read_block(self) -> np.ndarray:
+        """Return the next captured mono float32 block, or None once the input has closed."""
+        pass
+
+    @abstractmethod
+    async def play(self, audio: np.ndarray, sample_rate: int):
+        """Queue PCM audio for playback; may wait while too much audio is already queued."""
+        pass
+
+    @abstractmethod
+    async def drain(self):
+        """Wait until everything queued has been played."""
+        pass
+
+    @abstractmethod
+    def stop(self):
+        """Drop queued audio immediately, e.g. on barge-in."""
+        pass
+
+    def fade_out(self):
+        """Stop queued audio with a short fade rather than a click; defaults to stop()."""
+        self.stop()
+
+    def close(self):
+        pass
@@ -0,0 +1,64 @@
+'''
+Description: BaseAudioIO implementation on top of the local AudioEngine.
+Captured blocks are copied out of the engine callback onto an asyncio queue;
+playback goes through a PlaybackBuffer registered on the engine's output stream,
+followed by a PlaybackReference so barge-in detection can discount the echo.
+'''
+
+import asyncio
+from core.audio.audio_engine import AudioEngine
+from core.audio.barge_in import PlaybackReference
+from core.audio.base_io import BaseAudioIO
+from core.audio.pcm import to_mono_float32
+from core.audio.playback import PlaybackBuffer
+
+
+class LocalAudioIO(BaseAudioIO):
+    def __init__(self, audio_engine: AudioEngine, max_queued_seconds=2.0):
+        self.audio_engine = audio_engine
+        self.input_rate = audio_engine.input_rate
+        self.max_queued_frames = int(max_queued_seconds * audio_engine.output_rate)
+        self.player = PlaybackBuffer()
+        self.reference = PlaybackReference()
+        self.blocks = None
+        self.loop = None
+
+    def start(self):
+        """Attach to the engine; must be called from the running event loop."""
+        self.loop = asyncio.get_running_loop()
+        self.blocks = asyncio.Queue()
+        self.audio_engine.start()
+        self.audio_engine.add_input_listener(self.on_block)
+        self.audio_engine.add_output_source(self.player)
+        # After the player, so the reference sees the mixed output
+        self.audio_engine.add_output_source(self.reference)
+
+    def on_block(self, block):
+        # Runs on the PortAudio thread; the block is only valid during this call
+        self.loop.call_soon_threadsafe(self.blocks.put_nowait, block.copy())
+
+    async def read_block(self):
+        return await self.blocks.get()
+
+    async def play(self, audio, sample_rate):
+        # Backpressure: keep at most max_queued_seconds buffered ahead of the speaker
+        while self.player.pending_frames > self.max_queued_frames:
+            await asyncio.sleep(0.02)
+        self.player.push(to_mono_float32(audio, sample_rate, self.audio_engine.output_rate))
+
+    async def drain(self):
+        while not self.player.idle.is_set():
+            await asyncio.sleep(0.02)
+
+    def stop(self):
+        self.player.clear()
+
+    def fade_out(self):
+        self.player.fade_out()
+
+    def close(self):
+        self.audio_engine.remove_input_listener(self.on_block)
+        self.audio_engine.remove_output_source(self.player)
+        self.audio_engine.remove_output_source(self.reference)
+        if self.blocks is not None:
+            self.loop.call_soon_threadsafe(self.blocks.put_nowait, None)
@@ -0,0 +1,89 @@
+'''
+Description: BaseAudioIO implementation over a TCP stream of framed PCM.
+Every frame is a 1-byte type, a 4-byte big-endian payload length and the
+payload. Clients send FRAME_AUDIO frames with 16-bit little-endian mono PCM
+at `input_rate` and a FRAME_END frame to hang up. The server sends
+FRAME_AUDIO frames at the TTS rate, FRAME_STOP to flush the client's
+playback on barge-in, and FRAME_EVENT frames carrying JSON status messages.
+'''
+
+import asyncio
+import json
+import struct
+import time
+import numpy as np
+from core.audio.base_io import BaseAudioIO
+from core.audio.pcm import to_mono_float32
+
+FRAME_AUDIO = b"A"
+FRAME_END = b"E"
+FRAME_STOP = b"S"
+FRAME_EVENT = b"J"
+HEADER = struct.Struct(">cI")
+MAX_FRAME_BYTES = 1 << 20
+
+
+async def read_frame(reader):
+    """Return (frame_type, payload), or (FRAME_END, b"") when the peer has gone away."""
+    try:
+        frame_type, length = HEADER.unpack(await reader.readexactly(HEADER.size))
+        if length > MAX_FRAME_BYTES:
+            raise ValueError(f"Frame of {length} bytes exceeds the limit")
+        return frame_type, await reader.readexactly(length)
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return FRAME_END, b""
+
+
+def write_frame(writer, frame_type, payload=b""):
+    writer.write(HEADER.pack(frame_type, len(payload)) + payload)
+
+
+class NetworkAudioIO(BaseAudioIO):
+    def __init__(self, reader, writer, input_rate=16000, output_rate=24000, max_queued_seconds=2.0):
+        self.reader = reader
+        self.writer = writer
+        self.input_rate = input_rate
+        self.output_rate = output_rate
+        self.max_queued_seconds = max_queued_seconds
+        # Wall-clock time at which the client will have played everything sent so far
+        self.played_until = 0.0
+        self.closed = False
+
+    async def read_block(self):
+        while not self.closed:
+            frame_type, payload = await read_frame(self.reader)
+            if frame_type == FRAME_AUDIO:
+                return to_mono_float32(np.frombuffer(payload, dtype="<i2"), self.input_rate)
+            if frame_type == FRAME_END:
+                self.closed = True
+        return None
+
+    async def play(self, audio, sample_rate):
+        # Pace sending so the client never holds more than max_queued_seconds
+        while self.played_until - time.monotonic() > self.max_queued_seconds:
+            await asyncio.sleep(0.02)
+        audio = to_mono_float32(audio, sample_rate, self.output_rate)
+        pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2")
+        write_frame(self.writer, FRAME_AUDIO, pcm.tobytes())
+        await self.writer.drain()
+        self.played_until = max(self.played_until, time.monotonic()) + len(audio) / self.output_rate
+
+    async def drain(self):
+        delay = self.played_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def stop(self):
+        self.played_until = 0.0
+        if not self.writer.is_closing():
+            write_frame(self.writer, FRAME_STOP)
+
+    def send_event(self, event, **fields):
+        """Send a JSON status message, e.g. transcripts or queue position."""
+        if not self.writer.is_closing():
+            write_frame(self.writer, FRAME_EVENT, json.dumps({"event": event, **fields}).encode("utf-8"))
+
+    def close(self):
+        self.closed = True
+        if not self.writer.is_closing():
+            self.writer.close()
@@ -0,0 +1,24 @@
+'''
+Description: Helpers for converting PCM buffers between formats and sample rates.
+'''
+
+import numpy as np
+from scipy.signal import resample_poly
+
+
+def to_mono_float32(audio, sample_rate, target_rate=None):
+    """Convert a PCM buffer to a mono float32 array in [-1, 1].
+
+    Integer buffers are scaled by their dtype's range. When `target_rate`
+    differs from `sample_rate` the result is resampled with a polyphase filter.
+    """
+    audio = np.asarray(audio)
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1)
+    if np.issubdtype(audio.dtype, np.integer):
+        audio = audio.astype(np.float32) / np.iinfo(audio.dtype).max
+    else:
+        audio = audio.astype(np.float32, copy=False)
+    if target_rate and sample_rate != target_rate:
+        audio = resample_poly(audio, target_rate, sample_rate).astype(np.float32)
+    return audio
@@ -0,0 +1,99 @@
+'''
+Description: Jitter buffer that feeds the AudioEngine's output stream.
+Synthesized sentences are pushed as they become available and the output
+callback pulls exactly one block of frames at a time, crossing sentence
+boundaries without a gap. clear() takes effect on the next output block.
+Audio pushed with a label has its played frames counted in `progress`, and
+the output blocks in which it started and finished playing recorded in
+`timeline`, so callers can tell how much of each sentence actually reached
+the speaker and when.
+'''
+
+import collections
+import threading
+import time
+import numpy as np
+
+
+class PlaybackBuffer:
+    def __init__(self):
+        self.items = collections.deque()  # [audio, position, label] items, oldest first
+        self.lock = threading.Lock()
+        self.idle = threading.Event()
+        self.idle.set()
+        self.frames_played = 0
+        self.progress = {}  # label -> frames played
+        self.timeline = {}  # label -> [first, last] time.monotonic() of the blocks that played it
+
+    def push(self, audio, label=None):
+        """Queue a mono float32 array at the engine's output rate."""
+        with self.lock:
+            self.items.append([audio, 0, label])
+            if label is not None:
+                self.progress.setdefault(label, 0)
+            self.idle.clear()
+
+    def clear(self):
+        """Drop everything that has not been played yet."""
+        with self.lock:
+            self.items.clear()
+            self.idle.set()
+
+    def fade_out(self, frames=480):
+        """Stop cleanly: play at most `frames` more frames, ramped down to silence, and drop the rest."""
+        with self.lock:
+            if not self.items:
+                return
+            audio, position, label = self.items[0]
+            tail = audio[position:position + frames]
+            self.items.clear()
+            if len(tail):
+                ramp = np.linspace(1.0, 0.0, len(tail), dtype=np.float32)
+                self.items.append([tail * ramp, 0, label])
+            else:
+                self.idle.set()
+
+    def played(self, label):
+        """Frames of the audio pushed with `label` that have been played so far."""
+        with self.lock:
+            return self.progress.get(label, 0)
+
+    def played_between(self, label):
+        """(first, last) monotonic times of the output blocks that played `label`, or None."""
+        with self.lock:
+            span = self.timeline.get(label)
+            return tuple(span) if span else None
+
+    def forget(self):
+        """Drop the progress of labels that are no longer queued."""
+        with self.lock:
+            queued = {label for _, _, label in self.items}
+            self.progress = {label: n for label, n in self.progress.items() if label in queued}
+            self.timeline = {label: span for label, span in self.timeline.items() if label in queued}
+
+    @property
+    def pending_frames(self):
+        with self.lock:
+            return sum(len(audio) - position for audio, position, _ in self.items)
+
+    def fill(self, out):
+        """Mix the next block of audio into `out`; called from the output callback."""
+        written = 0
+        now = time.monotonic()
+        with self.lock:
+            while written < len(out) and self.items:
+                item = self.items[0]
+                audio, position, label = item
+                n = min(len(out) - written, len(audio) - position)
+                out[written:written + n] += audio[position:position + n]
+                item[1] += n
+                written += n
+                if label is not None:
+                    self.progress[label] += n
+                    span = self.timeline.setdefault(label, [now, now])
+                    span[1] = now
+                if item[1] >= len(audio):
+                    self.items.popleft()
+            self.frames_played += written
+            if not self.items:
+                self.idle.set()
@@ -0,0 +1,75 @@
+'''
+Description: Fixed-capacity float32 ring buffer for real-time audio.
+The backing array is allocated once. write() copies each block from the audio
+callback into it without allocating, and readers get numpy views addressed by
+absolute sample position. Consumers such as the streaming transcriber can
+block on wait_for() until enough new audio has arrived.
+'''
+
+import threading
+import numpy as np
+
+
+class AudioRingBuffer:
+    def __init__(self, capacity, dtype=np.float32):
+        self.capacity = int(capacity)
+        self.buffer = np.zeros(self.capacity, dtype=dtype)
+        self.total_written = 0  # Absolute number of samples written since reset()
+        self.condition = threading.Condition()
+
+    def reset(self):
+        """Discard all audio and restart absolute positions at zero."""
+        with self.condition:
+            self.total_written = 0
+            self.condition.notify_all()
+
+    @property
+    def oldest(self):
+        """Absolute position of the oldest sample still held in the buffer."""
+        return max(0, self.total_written - self.capacity)
+
+    def write(self, block):
+        """Copy a mono block into the buffer, overwriting the oldest samples if full."""
+        n = len(block)
+        if n > self.capacity:
+            block = block[-self.capacity:]
+            skipped, n = n - self.capacity, self.capacity
+        else:
+            skipped = 0
+        start = (self.total_written + skipped) % self.capacity
+        first = min(n, self.capacity - start)
+        self.buffer[start:start + first] = block[:first]
+        if first < n:
+            self.buffer[:n - first] = block[first:]
+        with self.condition:
+            self.total_written += skipped + n
+            self.condition.notify_all()
+
+    def read(self, start=None, end=None):
+        """Return samples in the absolute range [start, end).
+
+        The result is a view into the buffer when the range does not wrap around
+        the end of the backing array, and a copy otherwise. Views are only valid
+        until the samples are overwritten.
+        """
+        end = self.total_written if end is None else min(end, self.total_written)
+        start = self.oldest if start is None else max(start, self.oldest)
+        if start >= end:
+            return self.buffer[:0]
+        i, j = start % self.capacity, end % self.capacity
+        if i < j or j == 0:
+            return self.buffer[i:j or self.capacity]
+        return np.concatenate((self.buffer[i:], self.buffer[:j]))
+
+    def wait_for(self, predicate, timeout=None):
+        """Block until `predicate()` is true; it is re-checked after every write."""
+        with self.condition:
+            return self.condition.wait_for(predicate, timeout)
+
+    def notify(self):
+        """Wake up threads blocked in wait_for(), e.g. after changing their stop flag."""
+        with self.condition:
+            self.condition.notify_all()
+
+    def __len__(self):
+        return self.total_written - self.oldest
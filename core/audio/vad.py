@@ -0,0 +1,117 @@
+'''
+Description: Energy-based voice activity detector used for end-pointing.
+process() is called from the sounddevice callback with every captured block.
+Each block is split into short frames whose RMS is compared against an
+adaptive noise floor. Speech has to persist for a few frames before it counts
+(so a single click is ignored), and the end of an utterance is signalled
+through a threading.Event once enough trailing silence has been seen.
+A shorter pause sets the likely_end event first, which is cleared again if
+the speaker carries on; callers can use it to start work speculatively.
+'''
+
+import threading
+import numpy as np
+
+
+class VoiceActivityDetector:
+    def __init__(self, sample_rate=16000, frame_size=256, min_speech_level=0.01, snr_ratio=3.0,
+                 onset_frames=3, end_silence=0.8, min_duration=1.0, max_duration=30.0,
+                 noise_attack=0.2, noise_release=0.002, likely_end_silence=0.3):
+        self.fs = sample_rate
+        self.frame_size = frame_size
+        self.min_speech_level = min_speech_level  # Absolute RMS below which nothing is speech
+        self.snr_ratio = snr_ratio  # Speech must be this many times louder than the noise floor
+        self.onset_frames = onset_frames  # Consecutive loud frames needed to count as speech
+        self.end_silence = end_silence  # Seconds of trailing silence that end an utterance
+        self.likely_end_silence = likely_end_silence  # Shorter pause that probably ends the turn
+        self.min_duration = min_duration
+        self.max_duration = max_duration
+        self.noise_attack = noise_attack  # How fast the floor follows quieter frames
+        self.noise_release = noise_release  # How fast the floor creeps up under steady noise
+
+        self.speech_started = threading.Event()
+        self.end_of_utterance = threading.Event()
+        self.likely_end = threading.Event()
+        self.reset()
+
+    def reset(self):
+        """Prepare for a new utterance."""
+        self.noise_floor = None
+        self.speech_run = 0
+        self.silence_frames = 0
+        self.frames_seen = 0
+        self.speech_detected = False
+        self.speech_started.clear()
+        self.end_of_utterance.clear()
+        self.likely_end.clear()
+
+    def assume_speech(self):
+        """Start as if speech had already been confirmed, for a recording that continues a barge-in.
+
+        The noise floor starts at its lowest value, so the agent's echo at the
+        start of the audio cannot raise it above the candidate's voice.
+        """
+        self.noise_floor = self.min_speech_level / self.snr_ratio
+        self.speech_detected = True
+        self.speech_started.set()
+
+    @property
+    def frame_duration(self):
+        return self.frame_size / self.fs
+
+    def frame_rms(self, block):
+        """RMS of each full frame in a mono block."""
+        n = len(block) // self.frame_size
+        frames = block[:n * self.frame_size].reshape(n, self.frame_size)
+        return np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+
+    def is_speech_frame(self, rms):
+        """Classify a frame and update the noise floor from non-speech frames."""
+        if self.noise_floor is None:
+            self.noise_floor = rms
+        is_speech = rms > max(self.noise_floor * self.snr_ratio, self.min_speech_level)
+        if rms < self.noise_floor:
+            self.noise_floor += self.noise_attack * (rms - self.noise_floor)
+        elif not is_speech:
+            self.noise_floor += self.noise_release * (rms - self.noise_floor)
+        return is_speech
+
+    def process(self, block):
+        """Feed one mono float32 block from the audio callback."""
+        if self.end_of_utterance.is_set():
+            return
+        for rms in self.frame_rms(block):
+            self.frames_seen += 1
+            if self.is_speech_frame(rms):
+                self.speech_run += 1
+                if self.speech_run >= self.onset_frames:
+                    self.silence_frames = 0
+                    self.likely_end.clear()
+                    if not self.speech_detected:
+                        self.speech_detected = True
+                        self.speech_started.set()
+                else:
+                    # Too short to count yet (e.g. a click); silence keeps accumulating
+                    self.silence_frames += 1
+            else:
+                self.speech_run = 0
+                self.silence_frames += 1
+            if (self.speech_detected and self.likely_end_silence is not None
+                    and self.silence_frames * self.frame_duration >= self.likely_end_silence):
+                self.likely_end.set()
+            if self.check_end():
+                break
+
+    def check_end(self):
+        """Signal end of utterance on trailing silence or when the maximum duration is hit."""
+        elapsed = self.frames_seen * self.frame_duration
+        if elapsed >= self.max_duration:
+            print("\nMaximum recording duration reached")
+        elif (self.speech_detected
+              and self.silence_frames * self.frame_duration >= self.end_silence
+              and elapsed >= self.min_duration):
+            print("\nSilence detected, stopping recording")
+        else:
+            return False
+        self.end_of_utterance.set()
+        return True
@@ -0,0 +1,69 @@
+'''
+Description: In-memory WAV decoding for TTS responses.
+decode_wav() parses the RIFF header of a WAV byte string and returns the
+samples as a numpy view on the original bytes, so synthesized audio never
+has to go through a temporary file.
+'''
+
+import struct
+import numpy as np
+from scipy.io import wavfile
+
+# (format tag, bits per sample) -> sample dtype
+WAV_DTYPES = {
+    (1, 8): np.uint8,
+    (1, 16): np.dtype("<i2"),
+    (1, 32): np.dtype("<i4"),
+    (3, 32): np.dtype("<f4"),
+    (3, 64): np.dtype("<f8"),
+}
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def decode_wav(data):
+    """Decode WAV bytes into (sample_rate, samples) without copying the samples.
+
+    Mono audio is returned as a 1-D array and multi-channel audio as
+    (frames, channels). The array is a read-only view on `data`.
+    """
+    data = memoryview(data)
+    if len(data) < 12 or data[0:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise ValueError("Not a RIFF/WAVE byte string")
+
+    fmt = None
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk_id = bytes(data[offset:offset + 4])
+        chunk_size = struct.unpack_from("<I", data, offset + 4)[0]
+        body = offset + 8
+        if chunk_id == b"fmt ":
+            fmt = struct.unpack_from("<HHIIHH", data, body)
+            if fmt[0] == WAVE_FORMAT_EXTENSIBLE:
+                # The real format tag is the first field of the sub-format GUID
+                fmt = (struct.unpack_from("<H", data, body + 24)[0],) + fmt[1:]
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("WAV data chunk appears before the fmt chunk")
+            format_tag, channels, sample_rate, _, _, bits = fmt
+            dtype = WAV_DTYPES.get((format_tag, bits))
+            if dtype is None:
+                raise ValueError(f"Unsupported WAV format {format_tag} with {bits} bits per sample")
+            # Streaming encoders may leave the size as 0 or 0xFFFFFFFF; use what is there
+            size = min(chunk_size, len(data) - body) if chunk_size else len(data) - body
+            count = size // np.dtype(dtype).itemsize
+            samples = np.frombuffer(data, dtype=dtype, count=count - count % channels, offset=body)
+            return sample_rate, samples if channels == 1 else samples.reshape(-1, channels)
+        # Chunks are padded to an even size
+        offset = body + chunk_size + (chunk_size & 1)
+    raise ValueError("WAV byte string has no data chunk")
+
+
+def decode_pcm16(data):
+    """View headerless little-endian 16-bit PCM bytes as an int16 array."""
+    return np.frombuffer(data, dtype="<i2", count=len(data) // 2)
+
+
+def write_wav(path, sample_rate, audio):
+    """Optional disk sink for synthesized or recorded audio."""
+    wavfile.write(path, sample_rate, audio)
+    return path
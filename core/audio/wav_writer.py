@@ -0,0 +1,43 @@
+'''
+Description: Background writer for archival WAV recordings.
+Recordings are queued from the conversation loop and written to disk on a
+separate thread so that file I/O never sits on the critical path of a turn.
+'''
+
+import os
+import queue
+import threading
+from scipy.io.wavfile import write
+
+
+class BackgroundWavWriter:
+    def __init__(self):
+        self.write_queue = queue.Queue()
+        self.writer_thread = threading.Thread(target=self.writer_worker, daemon=True)
+        self.writer_thread.start()
+
+    def writer_worker(self):
+        """Worker thread that writes queued recordings to disk."""
+        while True:
+            item = self.write_queue.get()
+            try:
+                if item is None:
+                    break
+                path, fs, audio = item
+                write(path, fs, audio)
+                print(f"Saved audio to: {os.path.abspath(path)}")
+            except Exception as e:
+                print(f"WAV write error: {e}")
+            finally:
+                self.write_queue.task_done()
+
+    def submit(self, path, fs, audio):
+        """Queue a recording to be written to `path` at sample rate `fs`."""
+        self.write_queue.put((path, fs, audio))
+
+    def close(self):
+        """Flush pending recordings and stop the writer thread."""
+        if self.writer_thread is not None:
+            self.write_queue.put(None)
+            self.writer_thread.join()
+            self.writer_thread = None
@@ -0,0 +1,288 @@
+'''
+This file contains the ConversationEngine, an asyncio-native alternative to
+RecruiterPipeline.run_conversation. Instead of running capture, STT, LLM and
+TTS one after another on a single thread, each stage is a task connected to
+the next by a bounded asyncio.Queue:
+
+    capture -> utterances -> STT -> LLM stream -> segmenter -> TTS -> playback
+
+Within a turn, the LLM, TTS and playback stages overlap: the first sentence
+plays while later ones are still being generated and synthesized. Capture
+keeps running during the response, and when the candidate starts speaking
+the response task is cancelled. The cancellation propagates through the
+turn's TaskGroup, so every stage stops and queued audio is dropped.
+While the agent speaks, barge-in is detected by a BargeInDetector referenced
+against the transport's playback, so the agent's own echo through the speaker
+does not interrupt it. Transports without a playback reference (headsets, or
+network clients that cancel echo themselves) fall back to the plain VAD.
+Audio I/O goes through BaseAudioIO, so the same engine runs on local sound
+devices or on a network transport.
+'''
+
+import asyncio
+import contextlib
+import os
+import sys
+import time
+
+from core.audio.barge_in import BargeInDetector
+from core.audio.base_io import BaseAudioIO
+from core.audio.ring_buffer import AudioRingBuffer
+from core.audio.vad import VoiceActivityDetector
+from core.llm.base_llm import BaseLLM
+from core.stt.base_stt import BaseSTT
+from core.tts.base_tts import BaseTTS
+from core.tts.fillers import FillerBank, FillerTracker
+from core.tts.segmenter import SentenceSegmenter, awith_deadlines
+from core.warmup import warm_up
+
+if sys.version_info < (3, 11, 0):
+    import taskgroup, exceptiongroup
+
+    asyncio.TaskGroup = taskgroup.TaskGroup
+    asyncio.ExceptionGroup = exceptiongroup.ExceptionGroup
+
+
+class ConversationEngine:
+    def __init__(self, stt: BaseSTT, llm: BaseLLM, tts: BaseTTS, audio_io: BaseAudioIO,
+                 language="hi-IN", queue_size=4, barge_in=True,
+                 end_silence=0.8, min_duration=1.0, max_duration=30.0, warmup=False,
+                 fillers: FillerBank = None):
+        self.stt = stt
+        self.llm = llm
+        self.tts = tts
+        self.audio_io = audio_io
+        self.language = language
+        self.queue_size = queue_size
+        self.barge_in = barge_in
+        self.warmup = warmup  # Warm STT and TTS in the background when run() starts
+        self.fillers = fillers  # Acknowledgements played while the reply is prepared
+        self.filler_tracker = FillerTracker()
+
+        self.fs = audio_io.input_rate
+        self.capture_buffer = AudioRingBuffer(int(max_duration * self.fs) + self.fs)
+        self.vad = VoiceActivityDetector(
+            sample_rate=self.fs,
+            end_silence=end_silence,
+            min_duration=min_duration,
+            max_duration=max_duration
+        )
+        # Echo-aware onset detection while the agent speaks; None without a playback reference
+        self.echo_detector = None
+        if audio_io.reference is not None:
+            self.echo_detector = BargeInDetector(audio_io.reference, sample_rate=self.fs)
+        self.segmenter = SentenceSegmenter(language)
+
+        self.utterances = None  # Created in run(), inside the event loop
+        self.response_task = None
+        self.warmup_task = None
+        self.conversation_history = []
+        self.latency_history = []
+
+    def is_responding(self):
+        return self.response_task is not None and not self.response_task.done()
+
+    def interrupt(self):
+        """Barge-in: cancel the response in progress and drop queued audio."""
+        if self.is_responding():
+            print("\nInterrupted by user")
+            self.response_task.cancel()
+        self.audio_io.stop()
+
+    async def capture(self):
+        """Stage 1: run the VAD over captured blocks and queue finished utterances."""
+        while True:
+            block = await self.audio_io.read_block()
+            if block is None:
+                break
+            if self.is_responding() and not self.barge_in:
+                # Without barge-in the agent does not listen while it speaks
+                continue
+            if self.is_responding() and self.echo_detector is not None \
+                    and not self.echo_detector.speech_started.is_set():
+                self.echo_detector.listen(block)
+                if self.echo_detector.speech_started.is_set():
+                    self.interrupt()
+                    # Record from just before the onset, which the detector kept
+                    self.capture_buffer.reset()
+                    self.vad.reset()
+                    self.vad.assume_speech()
+                    self.echo_detector.take(self.record)
+                continue
+
+            self.record(block)
+            if self.is_responding() and self.echo_detector is None and self.vad.speech_started.is_set():
+                self.interrupt()
+
+            if self.vad.end_of_utterance.is_set():
+                if self.vad.speech_detected:
+                    self.queue_utterance(self.capture_buffer.read(0).copy())
+                self.capture_buffer.reset()
+                self.vad.reset()
+        self.utterances.put_nowait(None)
+
+    def record(self, audio):
+        self.capture_buffer.write(audio)
+        self.vad.process(audio)
+
+    def queue_utterance(self, audio):
+        """Queue without blocking capture; the oldest utterance is dropped if the queue is full."""
+        if self.utterances.full():
+            print("Utterance queue full, dropping the oldest utterance")
+            self.utterances.get_nowait()
+        self.utterances.put_nowait((audio, time.monotonic()))
+
+    async def converse(self):
+        """Stage 2: transcribe each utterance and run the response for it."""
+        while True:
+            item = await self.utterances.get()
+            if item is None:
+                break
+            audio, speech_end = item
+            if self.warmup_task:
+                await self.warmup_task
+
+            latency = {"interrupted": False}
+            await self.play_filler(latency, speech_end)
+            stt_start = time.monotonic()
+            text = await self.stt.transcribe_array_async(audio, self.fs)
+            latency["stt"] = time.monotonic() - stt_start
+            if not text:
+                if self.filler_tracker.should_cut(latency):
+                    self.audio_io.fade_out()
+                continue
+            print(f"User: {text}")
+
+            if self.echo_detector is not None:
+                self.echo_detector.reset()
+            self.response_task = asyncio.create_task(self.respond(text, latency, speech_end))
+            # asyncio.wait does not propagate the response task's cancellation to us
+            await asyncio.wait([self.response_task])
+            latency["interrupted"] = self.response_task.cancelled()
+            if not latency["interrupted"]:
+                self.response_task.result()
+            latency["total"] = time.monotonic() - speech_end
+            self.latency_history.append(latency)
+
+            if getattr(self.llm, "should_exit", False) and not latency["interrupted"]:
+                print("\nInterview completed.")
+                break
+
+    async def play_filler(self, latency, speech_end):
+        """Start a short acknowledgement in the language the candidate last spoke."""
+        if self.fillers is None:
+            return
+        filler = self.fillers.choose(getattr(self.stt, "detected_language", None) or self.language)
+        if filler is None:
+            return
+        await self.audio_io.play(filler["audio"], self.tts.sample_rate)
+        self.filler_tracker.started(filler, latency, speech_end)
+
+    async def respond(self, text, latency, speech_end):
+        """Run one response as three overlapping stages joined by bounded queues."""
+        units = asyncio.Queue(maxsize=self.queue_size)
+        audio_chunks = asyncio.Queue(maxsize=self.queue_size)
+        response = []
+        try:
+            async with asyncio.TaskGroup() as tg:
+                tg.create_task(self.generate(text, units, response, latency))
+                tg.create_task(self.synthesize(units, audio_chunks))
+                tg.create_task(self.play(audio_chunks, latency, speech_end))
+        finally:
+            self.conversation_history.append({"user": text, "ai": "".join(response)})
+
+    async def generate(self, text, units, response, latency):
+        """Stage 3: stream the LLM response and segment it into TTS units."""
+        llm_start = time.monotonic()
+        self.segmenter.reset(self.language)
+        try:
+            async with contextlib.aclosing(self.llm.generate_response_async(text)) as chunks, \
+                    contextlib.aclosing(awith_deadlines(chunks, self.segmenter)) as timed_chunks:
+                # None means the model has stalled past max_latency with text buffered
+                async for chunk in timed_chunks:
+                    if chunk is None:
+                        for unit in self.segmenter.poll():
+                            await units.put(unit)
+                        continue
+                    if "first_response" not in latency:
+                        latency["first_response"] = time.monotonic() - llm_start
+                    response.append(chunk)
+                    for unit in self.segmenter.push(chunk):
+                        await units.put(unit)
+            for unit in self.segmenter.flush():
+                await units.put(unit)
+        finally:
+            self.segmenter.reset()
+        await units.put(None)
+
+    async def synthesize(self, units, audio_chunks):
+        """Stage 4: synthesize units in order while earlier ones play."""
+        while (unit := await units.get()) is not None:
+            audio = await self.tts.synthesize_async(unit, self.language)
+            await audio_chunks.put(audio)
+        await audio_chunks.put(None)
+
+    async def play(self, audio_chunks, latency, speech_end):
+        """Stage 5: hand synthesized audio to the output and wait for it to finish."""
+        while (audio := await audio_chunks.get()) is not None:
+            if "first_audio" not in latency:
+                latency["first_audio"] = time.monotonic() - speech_end
+                if self.filler_tracker.should_cut(latency):
+                    # Real audio is ready; fade the filler out instead of talking over it
+                    self.audio_io.fade_out()
+            await self.audio_io.play(audio, self.tts.sample_rate)
+        await self.audio_io.drain()
+
+    async def run(self):
+        """Run the interview until the LLM ends it or the audio input closes."""
+        self.utterances = asyncio.Queue(maxsize=self.queue_size)
+        self.audio_io.start()
+        if self.warmup:
+            components = [self.stt, self.tts] + ([self.fillers] if self.fillers else [])
+            self.warmup_task = asyncio.create_task(asyncio.to_thread(warm_up, *components))
+        try:
+            async with asyncio.TaskGroup() as tg:
+                tg.create_task(self.capture())
+                converse_task = tg.create_task(self.converse())
+
+                await converse_task
+                raise asyncio.CancelledError("Interview finished")
+        except asyncio.CancelledError:
+            pass
+        finally:
+            if self.is_responding():
+                self.response_task.cancel()
+            self.audio_io.stop()
+            self.audio_io.close()
+
+
+async def main():
+    from core.audio.audio_engine import AudioEngine
+    from core.audio.local_io import LocalAudioIO
+    from core.llm.openai_llm import OpenAILLM
+    from core.stt.registry import create_stt
+    from core.tts.google_tts_2 import GoogleTTS
+
+    audio_engine = AudioEngine(
+        input_device=os.getenv("AUDIO_INPUT_DEVICE", 1),
+        output_device=os.getenv("AUDIO_OUTPUT_DEVICE")
+    )
+    tts = GoogleTTS()
+    llm = OpenAILLM()
+    engine = ConversationEngine(
+        create_stt(os.getenv("STT_BACKEND", "whisper")),
+        llm,
+        tts,
+        LocalAudioIO(audio_engine),
+        warmup=True,
+        fillers=FillerBank(tts)
+    )
+    try:
+        await engine.run()
+    finally:
+        llm.close()
+        audio_engine.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,9 +1,57 @@
 # Description: This file contains the abstract class for the LLM model.
 
+import asyncio
+import threading
 from abc import ABC, abstractmethod
 
 # core/llm/base_llm.py
 class BaseLLM(ABC):
+    def load(self):
+        """Create the API client. Idempotent; constructors only store configuration."""
+        pass
+
+    def warmup(self):
+        """Open the connection to the API ahead of the first turn."""
+        self.load()
+
+    def close(self):
+        pass
+
     @abstractmethod
     def generate_response(self, prompt: str, history: list) -> str:
         pass
+
+    async def generate_response_async(self, prompt: str):
+        """Async generator over the streamed response text.
+
+        The default runs the blocking stream on a worker thread and hands the
+        chunks to the event loop. Backends with a native async client should
+        override it. Closing the generator stops the worker at the next chunk.
+        """
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue()
+        cancelled = threading.Event()
+        done = object()
+
+        def produce():
+            try:
+                for chunk in self.generate_response(prompt, stream=True):
+                    if cancelled.is_set():
+                        break
+                    loop.call_soon_threadsafe(chunks.put_nowait, chunk)
+            except Exception as e:
+                loop.call_soon_threadsafe(chunks.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(chunks.put_nowait, done)
+
+        loop.run_in_executor(None, produce)
+        try:
+            while True:
+                chunk = await chunks.get()
+                if chunk is done:
+                    break
+                if isinstance(chunk, Exception):
+                    raise chunk
+                yield chunk
+        finally:
+            cancelled.set()
@@ -0,0 +1,139 @@
+'''
+Description: Token-budgeted conversation history for chat LLMs.
+Resending the whole interview on every turn makes the prompt, and with it the
+time to first token, grow for as long as the interview lasts. ConversationHistory
+keeps the recent turns verbatim and folds older turns into a rolling summary
+once the history exceeds its token budget. Summarization runs on a background
+thread between turns, so it never delays a reply. The summary is sent as a
+message after the system prompt, which leaves the system prompt unchanged so
+that provider-side prompt caching keeps matching the prefix.
+'''
+
+import threading
+
+# Per-message overhead of the chat format (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def load_token_counter(model):
+    """Return a function counting the tokens of a string, exactly with tiktoken when installed."""
+    try:
+        import tiktoken
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("o200k_base")
+        return lambda text: len(encoding.encode(text))
+    except ImportError:
+        # About 4 bytes of UTF-8 per token; Devanagari costs more per character, as in real tokenizers
+        return lambda text: len(text.encode("utf-8")) // 4 + 1
+
+
+class ConversationHistory:
+    def __init__(self, summarizer=None, budget_tokens=2000, keep_recent_turns=4, model="gpt-4o-mini"):
+        """
+        Args:
+            summarizer: Callable (previous_summary, messages) -> new summary. Without
+                one, turns over budget are dropped instead of summarized.
+            budget_tokens: Target size of the summary plus the verbatim turns
+            keep_recent_turns: Most recent user turns that are never folded
+            model: Model name used to pick the tokenizer
+        """
+        self.summarizer = summarizer
+        self.budget_tokens = budget_tokens
+        self.keep_recent_turns = keep_recent_turns
+        self.count_tokens = load_token_counter(model)
+        self.messages = []  # Verbatim messages, each with a cached "tokens" count
+        self.summary = ""
+        self.summary_tokens = 0
+        self.lock = threading.Lock()
+        self.summary_thread = None
+
+    def __iter__(self):
+        """Messages to send after the system prompt: the summary, then the recent turns."""
+        return iter(self.to_messages())
+
+    def __len__(self):
+        return len(self.messages)
+
+    def to_messages(self):
+        with self.lock:
+            messages = [{"role": m["role"], "content": m["content"]} for m in self.messages]
+            if self.summary:
+                messages.insert(0, {"role": "system", "content": f"Summary of the interview so far: {self.summary}"})
+            return messages
+
+    def append(self, message):
+        tokens = self.count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+        with self.lock:
+            self.messages.append({**message, "tokens": tokens})
+
+    def replace_last(self, message):
+        """Replace the last message if it has the same role, otherwise append `message`."""
+        tokens = self.count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+        with self.lock:
+            if self.messages and self.messages[-1]["role"] == message["role"]:
+                self.messages[-1] = {**message, "tokens": tokens}
+            else:
+                self.messages.append({**message, "tokens": tokens})
+
+    @property
+    def tokens(self):
+        with self.lock:
+            return self.summary_tokens + sum(m["tokens"] for m in self.messages)
+
+    def foldable_count(self):
+        """Number of leading messages that can be folded: whole turns outside the recent window."""
+        user_indices = [i for i, m in enumerate(self.messages) if m["role"] == "user"]
+        if len(user_indices) <= self.keep_recent_turns:
+            return 0
+        return user_indices[-self.keep_recent_turns] if self.keep_recent_turns else len(self.messages)
+
+    def end_turn(self):
+        """Call after the assistant's reply; starts a background summary if over budget."""
+        if self.tokens <= self.budget_tokens:
+            return
+        if self.summary_thread is not None and self.summary_thread.is_alive():
+            return
+        with self.lock:
+            count = self.foldable_count()
+            if count == 0:
+                return
+            folded = [{"role": m["role"], "content": m["content"]} for m in self.messages[:count]]
+            summary = self.summary
+        if self.summarizer is None:
+            self.replace_folded(count, "")
+            return
+        self.summary_thread = threading.Thread(target=self.summarize, args=(summary, folded), daemon=True)
+        self.summary_thread.start()
+
+    def summarize(self, summary, folded):
+        try:
+            new_summary = self.summarizer(summary, folded)
+        except Exception as e:
+            # Keep sending the turns verbatim and try again after the next turn
+            print(f"History summarization failed: {e}")
+            return
+        self.replace_folded(len(folded), new_summary)
+
+    def replace_folded(self, count, summary):
+        """Swap the first `count` messages for `summary` (dropped when empty)."""
+        with self.lock:
+            # Only messages appended after the fold was taken remain
+            self.messages = self.messages[count:]
+            if summary:
+                self.summary = summary
+                self.summary_tokens = self.count_tokens(summary) + MESSAGE_OVERHEAD_TOKENS
+        print(f"History folded {count} messages; {self.tokens} tokens remain")
+
+    def wait(self, timeout=None):
+        """Wait for a running summary to finish."""
+        if self.summary_thread is not None:
+            self.summary_thread.join(timeout)
+
+    def clear(self):
+        self.wait()
+        with self.lock:
+            self.messages = []
+            self.summary = ""
+            self.summary_tokens = 0
@@ -0,0 +1,143 @@
+'''
+Description: Incremental parser for the LLM's streamed JSON reply.
+The model answers with {"response": "...", "should_exit": bool}. Re-parsing the
+accumulated text after every delta is quadratic and only succeeds once the
+whole object has arrived. This parser is a small state machine fed one delta
+at a time: it returns the characters of the `response` string as soon as they
+arrive and sets `should_exit` as soon as that field has been read.
+'''
+
+ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+WHITESPACE = ' \t\r\n'
+
+
+class ResponseStreamParser:
+    def __init__(self, response_field="response", exit_field="should_exit"):
+        self.response_field = response_field
+        self.exit_field = exit_field
+        self.state = "start"
+        self.key = []
+        self.current_key = None
+        self.literal = []
+        self.escape = None  # Pending escape sequence, e.g. "\\u00"
+        self.high_surrogate = None
+        self.nested_depth = 0
+        self.nested_in_string = False
+        self.nested_escape = False
+
+        self.response_parts = []
+        self.should_exit = None  # None until the field has been parsed
+        self.done = False
+
+    @property
+    def response(self):
+        """The part of the response string decoded so far."""
+        return "".join(self.response_parts)
+
+    def feed(self, chunk):
+        """Consume the next delta and return any newly decoded response characters."""
+        out = []
+        for ch in chunk:
+            self.step(ch, out)
+        text = "".join(out)
+        if text:
+            self.response_parts.append(text)
+        return text
+
+    def read_string_char(self, ch):
+        """Decode one character inside a string. Returns (text, string_finished)."""
+        if self.escape is not None:
+            self.escape += ch
+            if self.escape[1] != 'u':
+                self.escape = None
+                return ESCAPES.get(ch, ch), False
+            if len(self.escape) < 6:
+                return "", False
+            code = int(self.escape[2:], 16)
+            self.escape = None
+            if 0xD800 <= code < 0xDC00:
+                # Wait for the low surrogate of the pair
+                self.high_surrogate = code
+                return "", False
+            if 0xDC00 <= code < 0xE000 and self.high_surrogate is not None:
+                code = 0x10000 + ((self.high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+                self.high_surrogate = None
+            return chr(code), False
+        if ch == '\\':
+            self.escape = '\\'
+            return "", False
+        if ch == '"':
+            return "", True
+        return ch, False
+
+    def finish_literal(self):
+        """Interpret a true/false/null/number value."""
+        if self.current_key == self.exit_field:
+            self.should_exit = "".join(self.literal) == "true"
+        self.literal = []
+
+    def step(self, ch, out):
+        state = self.state
+        if state == "start":
+            if ch == '{':
+                self.state = "key_or_end"
+        elif state == "key_or_end":
+            if ch == '"':
+                self.key = []
+                self.state = "key"
+            elif ch == '}':
+                self.state = "done"
+                self.done = True
+        elif state == "key":
+            text, finished = self.read_string_char(ch)
+            if finished:
+                self.current_key = "".join(self.key)
+                self.state = "colon"
+            else:
+                self.key.append(text)
+        elif state == "colon":
+            if ch == ':':
+                self.state = "value"
+        elif state == "value":
+            if ch in WHITESPACE:
+                return
+            if ch == '"':
+                self.state = "string_value"
+            elif ch in '{[':
+                self.nested_depth = 1
+                self.state = "nested"
+            else:
+                self.literal = [ch]
+                self.state = "literal"
+        elif state == "string_value":
+            text, finished = self.read_string_char(ch)
+            if finished:
+                self.state = "key_or_end"
+            elif self.current_key == self.response_field:
+                out.append(text)
+        elif state == "literal":
+            if ch in WHITESPACE or ch in ',}':
+                self.finish_literal()
+                self.state = "key_or_end"
+                if ch == '}':
+                    self.state = "done"
+                    self.done = True
+            else:
+                self.literal.append(ch)
+        elif state == "nested":
+            # Skip objects and arrays we do not care about
+            if self.nested_in_string:
+                if self.nested_escape:
+                    self.nested_escape = False
+                elif ch == '\\':
+                    self.nested_escape = True
+                elif ch == '"':
+                    self.nested_in_string = False
+            elif ch == '"':
+                self.nested_in_string = True
+            elif ch in '{[':
+                self.nested_depth += 1
+            elif ch in '}]':
+                self.nested_depth -= 1
+                if self.nested_depth == 0:
+                    self.state = "key_or_end"
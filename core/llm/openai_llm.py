@@ -3,6 +3,7 @@ This is the subclass of the BaseLLM class.
 It uses the OpenAI Chat API to generate responses.
 '''
 
+import asyncio
 import openai
 import os
 import json
@@ -11,11 +12,34 @@ load_dotenv(dotenv_path='../../.env')
 
 openai.api_key = os.getenv("OPENAI_API_KEY")
 from core.llm.base_llm import BaseLLM
+from core.llm.history import ConversationHistory
+from core.llm.json_stream import ResponseStreamParser
+from core import transport
+
+SUMMARY_PROMPT = """You maintain running notes on a job interview for the interviewer.
+Merge the new turns into the existing notes. Keep the candidate's background, skills, claims,
+answers worth following up and the questions already asked. Write in the language of the
+interview, in at most 150 words of plain text."""
+
+# Appended to a reply the candidate talked over, so the model knows it was not heard in full
+INTERRUPTION_MARKER = "<user interrupted while speaking hence cutoff mid speaking>"
 
 class OpenAILLM(BaseLLM):
-    def __init__(self, model="gpt-4o-mini-2024-07-18"):
+    def __init__(self, model="gpt-4o-mini-2024-07-18", async_client=None, history_budget_tokens=2000,
+                 keep_recent_turns=4, base_url=None):
         self.model = model
-        self.history = []
+        self.base_url = base_url  # Defaults to OPENAI_BASE_URL, then the public API
+        self.client = None  # Created by load() on the shared connection pool
+        # Older turns are summarized in the background so the prompt stays within budget
+        self.history = ConversationHistory(
+            summarizer=self.summarize_history,
+            budget_tokens=history_budget_tokens,
+            keep_recent_turns=keep_recent_turns,
+            model=model
+        )
+        self.should_exit = False  # Set from the last response, as soon as it is known while streaming
+        # Shared between sessions when given; otherwise created on first async use
+        self.async_client = async_client
         self.system_prompt = """You are an HR interviewer conducting a job interview. Be professional and thorough in your questions and responses.
 If the candidate indicates they want to end the interview (by saying goodbye, thank you, or similar phrases), respond appropriately and set should_exit=true in your response.
 Format your response as a JSON object with two fields:
@@ -24,6 +48,57 @@ Format your response as a JSON object with two fields:
     "should_exit": boolean indicating if the conversation should end
 }"""
         
+    def load(self):
+        if self.client is not None:
+            return
+        self.client = transport.openai_client(self.base_url)
+        # Keep the pooled connection open while the candidate is thinking
+        transport.keepalive().register(f"openai-{id(self)}", self.ping)
+        
+    def ping(self):
+        self.client.models.retrieve(self.model)
+        
+    def warmup(self):
+        """Open a connection to the API so the first turn skips the TLS handshake.
+        
+        This warms the client used by generate_response; the async client used
+        by generate_response_async keeps its own connection pool.
+        """
+        self.load()
+        self.ping()
+        
+    def close(self):
+        transport.keepalive().unregister(f"openai-{id(self)}")
+        if self.async_client is not None:
+            # Other sessions may share the client; the ping stops when the last of them closes
+            transport.keepalive().unregister(f"openai-async-{id(self.async_client)}", owner=id(self))
+        
+    def build_messages(self):
+        """System prompt followed by the conversation so far."""
+        return [
+            {"role": "system", "content": self.system_prompt},
+            *self.history
+        ]
+        
+    def record_reply(self, text):
+        """Add the assistant's reply to history and compact the history if it is over budget."""
+        self.history.append({"role": "assistant", "content": text})
+        self.history.end_turn()
+        
+    def summarize_history(self, summary, messages):
+        """Fold `messages` into the running summary; called on the history's background thread."""
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+        self.load()
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {"role": "user", "content": f"Existing notes:\n{summary or '(none)'}\n\nNew turns:\n{transcript}"}
+            ],
+            max_tokens=400
+        )
+        return response.choices[0].message.content.strip()
+        
     def generate_response(self, prompt, stream=False):
         """Generate a response from the LLM.
         
@@ -33,40 +108,119 @@ Format your response as a JSON object with two fields:
             
         Returns:
             If stream=False: A dict with 'response' and 'should_exit' fields
-            If stream=True: A generator yielding sentence fragments
+            If stream=True: A generator yielding fragments of the response text as they arrive
         """
         self.history.append({"role": "user", "content": prompt})
+        self.load()
+        transport.keepalive().touch(f"openai-{id(self)}")
         
-        response = openai.chat.completions.create(
+        response = self.client.chat.completions.create(
             model=self.model,
-            messages=[
-                {"role": "system", "content": self.system_prompt},
-                *self.history
-            ],
+            messages=self.build_messages(),
             response_format={ "type": "json_object" },
             stream=stream
         )
         
         if not stream:
-            response_json = eval(response.choices[0].message.content)
-            self.history.append({"role": "assistant", "content": response_json["response"]})
+            response_json = json.loads(response.choices[0].message.content)
+            self.should_exit = bool(response_json.get("should_exit", False))
+            self.record_reply(response_json["response"])
             return response_json
         else:
-            # For streaming, we need to accumulate the JSON response
-            accumulated_text = ""
+            return self.stream_response(response)
+            
+    def stream_response(self, response):
+        """Yield the `response` field of the streamed JSON reply incrementally.
+        
+        If the consumer closes the generator early (e.g. on barge-in), the HTTP
+        stream is closed and the part generated so far is saved to history.
+        """
+        self.should_exit = False
+        parser = ResponseStreamParser()
+        try:
+            for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    text = parser.feed(chunk.choices[0].delta.content)
+                    if parser.should_exit is not None:
+                        self.should_exit = parser.should_exit
+                    if text:
+                        yield text
+        finally:
+            response.close()
+            # Save the response to history
+            self.record_reply(parser.response)
+        return {"response": parser.response, "should_exit": self.should_exit}
+        
+    def record_interruption(self, heard_text):
+        """Replace the last reply in history with the part the candidate heard before interrupting."""
+        self.history.replace_last({"role": "assistant", "content": f"{heard_text} {INTERRUPTION_MARKER}".lstrip()})
+        
+    def stream_draft(self, prompt, parser):
+        """Stream a reply to `prompt` without touching history or should_exit.
+        
+        Used for speculative requests. `parser` is a ResponseStreamParser owned by
+        the caller, who reads should_exit from it. Closing the generator closes
+        the HTTP stream. Call commit_draft to keep the reply.
+        """
+        self.load()
+        transport.keepalive().touch(f"openai-{id(self)}")
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[*self.build_messages(), {"role": "user", "content": prompt}],
+            response_format={ "type": "json_object" },
+            stream=True
+        )
+        try:
             for chunk in response:
-                if chunk.choices[0].delta.content:
-                    accumulated_text += chunk.choices[0].delta.content
-                    try:
-                        # Try to parse the accumulated text as JSON
-                        response_json = json.loads(accumulated_text)
-                        # If successful, yield the next part of the response
-                        yield response_json["response"]
-                        break
-                    except json.JSONDecodeError:
-                        # If not valid JSON yet, continue accumulating
-                        continue
+                if chunk.choices and chunk.choices[0].delta.content:
+                    text = parser.feed(chunk.choices[0].delta.content)
+                    if text:
+                        yield text
+        finally:
+            response.close()
             
-            # Save the complete response to history
-            self.history.append({"role": "assistant", "content": response_json["response"]})
-            return response_json
+    def commit_draft(self, prompt, response, should_exit):
+        """Record a speculative exchange as if generate_response had produced it."""
+        self.history.append({"role": "user", "content": prompt})
+        self.should_exit = bool(should_exit)
+        self.record_reply(response)
+        
+    async def generate_response_async(self, prompt):
+        """Stream the response text with the native async client.
+        
+        If the consumer stops early (e.g. on barge-in), the part generated so
+        far is still saved to history.
+        """
+        self.history.append({"role": "user", "content": prompt})
+        if self.async_client is None:
+            self.async_client = transport.async_openai_client(self.base_url)
+        # Registering again marks the connection as used and follows the current event loop.
+        # Keyed by client, so sessions sharing one client share one ping. The ping holds
+        # only the client, so a closed session's LLM and history are not kept alive.
+        client, model = self.async_client, self.model
+        transport.keepalive().register(
+            f"openai-async-{id(client)}",
+            lambda: client.models.retrieve(model),
+            loop=asyncio.get_running_loop(),
+            owner=id(self)
+        )
+        
+        stream = await self.async_client.chat.completions.create(
+            model=self.model,
+            messages=self.build_messages(),
+            response_format={ "type": "json_object" },
+            stream=True
+        )
+        self.should_exit = False
+        parser = ResponseStreamParser()
+        try:
+            async with stream:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        text = parser.feed(chunk.choices[0].delta.content)
+                        if parser.should_exit is not None:
+                            self.should_exit = parser.should_exit
+                        if text:
+                            yield text
+        finally:
+            self.record_reply(parser.response)
@@ -0,0 +1,179 @@
+'''
+Description: Speculative LLM prefetch on partial transcripts.
+When the VAD sees a pause that probably ends the turn, the pipeline
+transcribes what it has so far and starts the LLM request straight away. The
+reply streams into a hidden buffer while the end-of-utterance silence runs
+out. If the final transcript is close enough to the partial one, the
+speculative reply is committed, buffered chunks first, and the time to first
+token has already been paid. Otherwise it is cancelled and a normal request
+is issued.
+
+The LLM must provide stream_draft(prompt, parser), which streams without
+touching history, and commit_draft(prompt, response, should_exit).
+'''
+
+import difflib
+import queue
+import re
+import threading
+import time
+
+from core.llm.json_stream import ResponseStreamParser
+
+DONE = object()
+
+
+def normalize(text):
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+
+def similarity(a, b):
+    """Character-level similarity in [0, 1], ignoring case and punctuation."""
+    return difflib.SequenceMatcher(None, normalize(a), normalize(b)).ratio()
+
+
+class SpeculativeRequest:
+    """An LLM reply streamed on a background thread into a queue nobody reads yet."""
+
+    def __init__(self, llm, prompt):
+        self.llm = llm
+        self.prompt = prompt
+        self.parser = ResponseStreamParser()
+        self.chunks = queue.Queue()
+        self.cancelled = threading.Event()
+        self.started_at = time.monotonic()
+        self.finished_at = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        stream = self.llm.stream_draft(self.prompt, self.parser)
+        try:
+            for text in stream:
+                if self.cancelled.is_set():
+                    break
+                self.chunks.put(text)
+        except Exception as e:
+            self.chunks.put(e)
+        finally:
+            stream.close()
+            self.finished_at = time.monotonic()
+            self.chunks.put(DONE)
+
+    def cancel(self):
+        """Stop at the next chunk; closing the stream aborts the HTTP request."""
+        self.cancelled.set()
+
+    def stream(self):
+        """Yield the buffered chunks, then the rest as they arrive."""
+        try:
+            while True:
+                item = self.chunks.get()
+                if item is DONE:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            self.cancel()
+
+
+class SpeculativePrefetcher:
+    def __init__(self, llm, similarity_threshold=0.9):
+        self.llm = llm
+        self.similarity_threshold = similarity_threshold
+        self.current = None
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.abandoned = 0  # Cancelled because the candidate kept talking
+        self.saved_seconds = []
+
+    def start(self, partial_text):
+        """Start (or keep) a speculative request for the partial transcript."""
+        if not partial_text.strip():
+            return
+        with self.lock:
+            if self.current is not None:
+                if normalize(self.current.prompt) == normalize(partial_text):
+                    return
+                self.current.cancel()
+                self.abandoned += 1
+            self.current = SpeculativeRequest(self.llm, partial_text)
+
+    def cancel(self):
+        """Drop the speculative request, e.g. because speech resumed."""
+        with self.lock:
+            if self.current is not None:
+                self.current.cancel()
+                self.abandoned += 1
+                self.current = None
+
+    def resolve(self, final_text):
+        """Return a generator over the speculative reply if it matches `final_text`, else None.
+
+        On a miss the speculative request is cancelled and the caller issues a
+        normal one.
+        """
+        with self.lock:
+            request, self.current = self.current, None
+        if request is None:
+            return None
+
+        score = similarity(request.prompt, final_text)
+        if score < self.similarity_threshold:
+            request.cancel()
+            self.misses += 1
+            print(f"Speculation missed (similarity {score:.2f})")
+            return None
+
+        # Time the request has been in flight is time the normal path would still have to wait
+        now = time.monotonic()
+        saved = min(now, request.finished_at or now) - request.started_at
+        self.hits += 1
+        self.saved_seconds.append(saved)
+        print(f"Speculation hit (similarity {score:.2f}, {saved:.2f}s ahead)")
+        return self.committed(request, final_text)
+
+    def committed(self, request, final_text):
+        """Yield the speculative reply and commit it once it has been delivered.
+
+        The committed text is what the consumer received, so a consumer that
+        stops early (e.g. on barge-in) commits only that part, and the parser
+        is not read while the request thread may still be feeding it. If the
+        request fails before anything was delivered, a normal request is
+        issued instead.
+        """
+        delivered = []
+        error = None
+        try:
+            for text in request.stream():
+                delivered.append(text)
+                yield text
+        except GeneratorExit:
+            # The consumer stopped early, e.g. on barge-in
+            self.llm.commit_draft(final_text, "".join(delivered), request.parser.should_exit)
+            raise
+        except Exception as e:
+            error = e
+        if error is None:
+            # The thread has closed the stream, so the parser is complete
+            request.thread.join()
+        elif not delivered:
+            print(f"Speculative reply failed, issuing a normal request: {error}")
+            yield from self.llm.generate_response(final_text, stream=True)
+            return
+        else:
+            # The candidate has heard the start of this reply; keep the part they heard
+            print(f"Speculative reply failed mid-stream: {error}")
+        self.llm.commit_draft(final_text, "".join(delivered), request.parser.should_exit)
+
+    def stats(self):
+        resolved = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "abandoned": self.abandoned,
+            "hit_rate": self.hits / resolved if resolved else 0.0,
+            "mean_saved": sum(self.saved_seconds) / len(self.saved_seconds) if self.saved_seconds else 0.0,
+        }
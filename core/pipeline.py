@@ -7,103 +7,230 @@ using the Text-to-Speech (TTS) module. The conversation is carried out in a loop
 the user exits the application.
 '''
 
-import sounddevice as sd
-import numpy as np
-from scipy.io.wavfile import write
+import contextlib
 import os
 from datetime import datetime
 import time
-import queue
 import threading
 
-from core.stt.whisper_stt import WhisperSTT
-from core.llm.openai_llm import OpenAILLM
+from core.audio.audio_engine import AudioEngine
+from core.audio.ring_buffer import AudioRingBuffer
+from core.audio.vad import VoiceActivityDetector
+from core.audio.wav_writer import BackgroundWavWriter
+from core.stt.base_stt import BaseSTT
+from core.stt.registry import create_stt
+from core.stt.streaming_stt import StreamingTranscriber
+from core.llm.openai_llm import INTERRUPTION_MARKER, OpenAILLM
+from core.llm.speculation import SpeculativePrefetcher
+from core.tts.fillers import FillerBank
+from core.tts.segmenter import DeadlineReader, SentenceSegmenter
 from core.tts.streaming_google_tts import StreamingGoogleTTS
+from core.tracing import Tracer
+from core.warmup import BackgroundWarmup
 
 class RecruiterPipeline:
-    def __init__(self, stt: WhisperSTT, llm: OpenAILLM, tts: StreamingGoogleTTS):
+    def __init__(self, stt: BaseSTT, llm: OpenAILLM, tts: StreamingGoogleTTS, audio_engine: AudioEngine,
+                 streaming_stt=False, warmup=True, fillers: FillerBank = None, speculative=False,
+                 tracer: Tracer = None):
         self.stt = stt
         self.llm = llm
         self.tts = tts
+        self.fillers = fillers  # Acknowledgements played while the reply is prepared
+        self.audio_engine = audio_engine
         self.audio_dir = "recordings"
         self.conversation_history = []
         self.latency_history = []
+        self.wav_writer = BackgroundWavWriter()
         
         # Audio recording parameters
-        self.fs = 16000  # Sample rate
-        self.silence_threshold = 0.01  # Adjust this value based on your needs
-        self.silence_duration = 2.0  # Seconds of silence before stopping
+        self.fs = audio_engine.input_rate  # Sample rate
+        self.silence_threshold = 0.01  # Minimum RMS level that can count as speech
+        self.silence_duration = 0.8  # Seconds of trailing silence that end an utterance
         self.min_duration = 1.0  # Minimum recording duration in seconds
         self.max_duration = 30.0  # Maximum recording duration in seconds
+        self.tts_language = "hi-IN"  # Language the agent speaks in
+        
+        # End-pointing runs inside the capture callback
+        self.vad = VoiceActivityDetector(
+            sample_rate=self.fs,
+            min_speech_level=self.silence_threshold,
+            end_silence=self.silence_duration,
+            min_duration=self.min_duration,
+            max_duration=self.max_duration
+        )
+        
+        # Pre-allocated capture buffer shared by the recorder and the streaming transcriber
+        self.capture_buffer = AudioRingBuffer(int(self.max_duration * self.fs) + self.fs)
+        
+        # Buffers streamed LLM text into sentence/clause units for TTS
+        self.segmenter = SentenceSegmenter(self.tts_language)
+        
+        # Transcribe incrementally while the candidate is speaking
+        self.streaming_transcriber = (
+            StreamingTranscriber(stt, self.capture_buffer, self.fs) if streaming_stt else None
+        )
+        
+        # Start the LLM request on a partial transcript at the first likely pause
+        self.prefetcher = SpeculativePrefetcher(llm) if speculative else None
+        self.speculation = None  # {"end", "thread", "text"} of this turn's latest partial transcript
+        self.response_reader = None  # DeadlineReader of the last response, which may still be closing
+        self.pause_start = None  # Capture position where the current likely end of turn began
+        
+        # Load models and open API connections while the first question is being set up
+        components = [stt, llm, tts] + ([fillers] if fillers else [])
+        self.warmup = BackgroundWarmup(*components).start() if warmup else None
         
         # Create recordings directory if it doesn't exist
         if not os.path.exists(self.audio_dir):
             os.makedirs(self.audio_dir)
         
-    def is_silent(self, data):
-        """Check if the audio chunk is silent."""
-        return np.max(np.abs(data)) < self.silence_threshold
+        # Per-stage spans of every turn, appended to a JSONL file as each turn ends
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.tracer = tracer or Tracer(os.path.join(self.audio_dir, f"trace_{timestamp}.jsonl"))
         
-    def record_audio(self):
-        """Record audio with automatic silence detection."""
+    def record_audio(self, trace=None):
+        """Record audio until the voice activity detector signals end of utterance."""
         print("Recording... (speak now)")
+        capture_start = time.monotonic()
         
         # Initialize variables for recording
-        audio_chunks = []  # Stores raw audio data chunks
-        silent_chunks = 0  # Counter for consecutive silent chunks
-        # Calculate how many silent chunks we need before stopping (duration * samples per chunk)
-        silent_chunk_threshold = int(self.silence_duration * self.fs / 1024)
         is_recording = True  # Flag to control recording state
-        start_time = time.time()  # Track when recording started
+        self.capture_buffer.reset()
+        self.vad.reset()
+        if self.streaming_transcriber:
+            if self.warmup:
+                # The transcriber starts decoding right away and must not race the warm-up's load()
+                self.warmup.wait()
+            self.streaming_transcriber.start()
         
-        # This callback function is called automatically for each audio block
-        def audio_callback(indata, frames, time_info, status):
-            if status:
-                print(status)  # Print any sounddevice errors/warnings
+        self.speculation = None
+        self.pause_start = None
+        
+        # This listener is called by the audio engine for each captured block
+        def audio_callback(block):
             if is_recording:
-                # Make a copy of the incoming audio data and store it
-                audio_chunks.append(indata.copy())
-        
-        # Start recording using sounddevice's InputStream
-        with sd.InputStream(samplerate=self.fs, channels=1, callback=audio_callback,
-                          blocksize=1024, device=1):
-            while is_recording:
-                # Safety check: don't record longer than maximum allowed duration
-                if time.time() - start_time > self.max_duration:
-                    print("\nMaximum recording duration reached")
-                    is_recording = False  # Stop recording
+                # Copy the block into the pre-allocated buffer; no allocation here
+                self.capture_buffer.write(block)
+                self.vad.process(block)
+        
+        # If the candidate interrupted the last answer, start from what they have said so far;
+        # the barge-in detector then forwards the live blocks. Otherwise subscribe to the
+        # engine's always-open input stream for this turn.
+        barge_in = self.tts.barged_in()
+        if barge_in:
+            # The candidate is already talking; the audio before the onset is mostly our own echo
+            self.vad.assume_speech()
+            self.tts.take_barge_in(audio_callback)
+        else:
+            self.audio_engine.add_input_listener(audio_callback)
+        try:
+            # The VAD also enforces max_duration; the deadline is only a safety net
+            deadline = capture_start + self.max_duration + 1.0
+            speculating = False
+            while not self.vad.end_of_utterance.wait(timeout=0.02):
+                if time.monotonic() >= deadline:
                     break
-                
-                # Only check for silence if we have some audio data
-                if len(audio_chunks) > 0:
-                    latest_chunk = audio_chunks[-1]  # Get most recent audio chunk
-                    
-                    # Check if current chunk is silent
-                    if self.is_silent(latest_chunk):
-                        silent_chunks += 1  # Increment silent counter
+                # Speculation is started from here, not from the audio callback
+                if self.prefetcher and self.vad.likely_end.is_set() != speculating:
+                    speculating = self.vad.likely_end.is_set()
+                    if speculating:
+                        self.pause_start = self.capture_buffer.total_written
+                        self.start_speculation(self.pause_start)
                     else:
-                        silent_chunks = 0  # Reset counter if noise is detected
-                    
-                    # Stop conditions: enough silence AND minimum recording time met
-                    if silent_chunks >= silent_chunk_threshold and time.time() - start_time > self.min_duration:
-                        print("\nSilence detected, stopping recording")
-                        is_recording = False  # Stop recording
-                        break
-                
-                # Pause briefly to avoid consuming too much CPU
-                time.sleep(0.1)  # 100ms delay between checks
-
-        is_recording = False  # Ensure flag is reset when exiting the stream
+                        # The candidate carried on; the partial transcript is stale
+                        self.prefetcher.cancel()
+        finally:
+            is_recording = False
+            if barge_in:
+                self.tts.stop_interrupt_detection()
+            else:
+                self.audio_engine.remove_input_listener(audio_callback)
+        capture_end = time.monotonic()
+        
+        # View of the utterance; valid until the next turn resets the buffer
+        recording = self.capture_buffer.read(0)
         
-        # Combine all chunks
-        recording = np.concatenate(audio_chunks, axis=0)
+        if trace is not None:
+            trace.add("capture", capture_start, capture_end, audio_seconds=len(recording) / self.fs, barge_in=barge_in)
+            if self.vad.speech_detected:
+                # The trailing silence the VAD waited through before calling the end of the utterance
+                trace.add("vad_endpoint", capture_end - self.vad.silence_frames * self.vad.frame_duration, capture_end)
         
-        # Save the recording
+        # Archive the recording off the critical path; the writer needs its own copy
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         input_filename = os.path.join(self.audio_dir, f"input_{timestamp}.wav")
-        write(input_filename, self.fs, recording)
-        print(f"Saved audio to: {os.path.abspath(input_filename)}")
-        return os.path.abspath(input_filename)
+        self.wav_writer.submit(input_filename, self.fs, recording.copy())
+        return recording
+    
+    def start_speculation(self, end):
+        """Transcribe the first `end` samples off the audio thread and start the LLM on them."""
+        if self.speculation is not None and self.speculation["thread"].is_alive():
+            return
+        speculation = {"end": end, "text": None}
+        def speculate():
+            if self.streaming_transcriber:
+                partial = self.streaming_transcriber.partial_text()
+            else:
+                # None if the model is busy: a partial must never hold up the final transcription
+                partial = self.stt.transcribe_partial(self.capture_buffer.read(0, end).copy(), self.fs)
+            if partial is None:
+                return
+            speculation["text"] = partial
+            # Speech may have resumed while the partial transcript was decoded, or the turn moved on
+            if self.speculation is speculation and self.vad.likely_end.is_set():
+                self.prefetcher.start(partial)
+        speculation["thread"] = threading.Thread(target=speculate, daemon=True)
+        self.speculation = speculation
+        speculation["thread"].start()
+        
+    def final_partial(self):
+        """The partial transcript of the pause that ended the turn, or None.
+        
+        Only silence was captured after that pause, so the partial transcript is
+        the final one, and it started decoding end_silence earlier than a new
+        transcription would. Any other speculation is stale and is not waited for.
+        """
+        speculation, self.speculation = self.speculation, None
+        if (speculation is None or self.streaming_transcriber or not self.vad.likely_end.is_set()
+                or speculation["end"] != self.pause_start):
+            return None
+        speculation["thread"].join()
+        return speculation["text"] or None
+    
+    def trace_response(self, trace, llm_start, last_chunk_time, segmenter_time, response):
+        """Add the LLM, TTS and playback spans of the response that just ended."""
+        if last_chunk_time is not None:
+            ttft = trace.first("llm_ttft")
+            tokens = self.llm.history.count_tokens(response) if response else 0
+            streaming = last_chunk_time - ttft["end"]
+            trace.add("llm", llm_start, last_chunk_time, tokens=tokens)
+            trace.set(llm_tokens=tokens, llm_tokens_per_second=tokens / streaming if streaming > 0 else None)
+        trace.set(segmenter_seconds=segmenter_time)
+        
+        for request in self.tts.requests:
+            trace.add("tts_request", request["start"], request["end"], chars=len(request["text"]))
+        
+        # Sentence timings come from the output blocks that played them
+        block = self.audio_engine.output_blocksize / self.audio_engine.output_rate
+        timeline = self.tts.playback_timeline()
+        for sentence in timeline:
+            trace.add("playback", sentence["start"], sentence["end"] + block, chars=len(sentence["text"]))
+        endpoint = trace.first("vad_endpoint")
+        if timeline and endpoint:
+            trace.add("first_audio", endpoint["start"], timeline[0]["start"])
+        for previous, following in zip(timeline, timeline[1:]):
+            # Back-to-back sentences share a block or start in the next one; anything later is an underrun
+            if following["start"] - previous["end"] > block:
+                trace.add("playback_gap", previous["end"] + block, following["start"])
+    
+    def play_filler(self):
+        """Start a short acknowledgement right after end of utterance; returns the filler or None."""
+        if self.fillers is None:
+            return None
+        filler = self.fillers.choose(getattr(self.stt, "detected_language", None) or self.tts_language)
+        if filler is not None:
+            self.tts.play_filler(filler["audio"])
+        return filler
     
     def save_conversation(self):
         """Save the conversation history and latencies to files with timestamp."""
@@ -117,50 +244,142 @@ class RecruiterPipeline:
                 f.write(f"User: {turn['user']}\n")
                 f.write(f"AI: {turn['ai']}\n\n")
         
+        metrics_file = os.path.join(self.audio_dir, f"metrics_{timestamp}.prom")
+        
         # Save latencies
         with open(latency_file, "w", encoding="utf-8") as f:
             f.write("Response Latencies (seconds):\n")
             for idx, latency in enumerate(self.latency_history, 1):
                 f.write(f"Turn {idx}:\n")
                 f.write(f"  STT Time: {latency['stt']:.2f}s\n")
-                f.write(f"  First Response Time: {latency.get('first_response', 0):.2f}s\n")
+                # None when the reply had no text, e.g. an empty goodbye
+                if latency.get('first_response') is not None:
+                    f.write(f"  First Response Time: {latency['first_response']:.2f}s\n")
                 f.write(f"  Total Time: {latency['total']:.2f}s\n")
+                if latency.get('speculative'):
+                    f.write("  (Speculative reply started before end of utterance)\n")
+                if latency.get('filler'):
+                    cut = ", faded out for the response" if latency.get('filler_cut') else ""
+                    f.write(f"  Filler: {latency['filler']}{cut}\n")
                 if latency.get('interrupted', False):
                     f.write("  (Response was interrupted)\n")
                 f.write("\n")
+            if self.prefetcher:
+                stats = self.prefetcher.stats()
+                f.write(f"Speculation: {stats['hits']} hits, {stats['misses']} misses, "
+                        f"{stats['abandoned']} abandoned, hit rate {stats['hit_rate']:.0%}, "
+                        f"{stats['mean_saved']:.2f}s saved per hit\n")
+            f.write("\nStage latencies (seconds):\n")
+            for line in self.tracer.report():
+                f.write(f"  {line}\n")
+        self.tracer.write_metrics(metrics_file)
         
         print(f"Conversation saved to: {os.path.abspath(conversation_file)}")
         print(f"Latencies saved to: {os.path.abspath(latency_file)}")
+        print(f"Metrics saved to: {os.path.abspath(metrics_file)}")
+        if self.tracer.trace_path:
+            print(f"Traces saved to: {os.path.abspath(self.tracer.trace_path)}")
         
     def run_conversation(self):
         try:
             while True:
-                turn_start = time.time()
+                trace = self.tracer.start_turn()
                 
                 # STT
-                audio_path = self.record_audio()
-                stt_start = time.time()
-                text = self.stt.transcribe(audio_path)
-                stt_time = time.time() - stt_start
+                audio = self.record_audio(trace)
+                filler = self.play_filler()
+                if self.warmup:
+                    # Normally done long before the first answer ends; never run STT twice at once
+                    self.warmup.wait()
+                partial = self.final_partial()
+                with trace.span("stt", backend=type(self.stt).__name__, reused_partial=partial is not None):
+                    if partial is not None:
+                        text = partial
+                    elif self.streaming_transcriber:
+                        # Only the unstable tail is left to decode at this point
+                        text = self.streaming_transcriber.finish()
+                    else:
+                        text = self.stt.transcribe_array(audio, self.fs)
+                # Steps of this thread's decode inside the span; a reused partial was decoded earlier
+                stt_start = trace.first("stt")["start"]
+                for step, (start, end) in self.stt.last_timings.items():
+                    if start >= stt_start:
+                        trace.add(f"stt.{step}", start, end)
+                stt_time = trace.duration("stt")
                 
                 # LLM with streaming
-                llm_start = time.time()
+                llm_start = time.monotonic()
                 first_response_time = None
+                last_chunk_time = None
+                segmenter_time = 0.0
                 accumulated_response = ""
                 was_interrupted = False
+                self.tts.begin_response()
+                self.segmenter.reset(self.tts_language)
+                
+                if self.response_reader is not None:
+                    # An interrupted stream saves its reply when it closes; history must be complete first
+                    self.response_reader.join()
+                
+                # A speculative reply started during the pause is used if the transcript still matches
+                response_stream = self.prefetcher.resolve(text) if self.prefetcher else None
+                speculation_hit = response_stream is not None
+                if response_stream is None:
+                    response_stream = self.llm.generate_response(text, stream=True)
                 
-                for response_chunk in self.llm.generate_response(text, stream=True):
-                    if not first_response_time:
-                        first_response_time = time.time() - llm_start
+                # Closing the stream on interruption stops the request, which records what was said
+                # once the reader gets to it. A None chunk means the model has stalled past max_latency
+                # with text buffered.
+                self.response_reader = DeadlineReader(response_stream, self.segmenter)
+                with contextlib.closing(self.response_reader) as response_chunks:
+                    for response_chunk in response_chunks:
+                        segment_start = time.monotonic()
+                        if response_chunk is None:
+                            units = self.segmenter.poll(segment_start)
+                        else:
+                            last_chunk_time = segment_start
+                            if not first_response_time:
+                                first_response_time = last_chunk_time - llm_start
+                                trace.add("llm_ttft", llm_start, last_chunk_time, speculative=speculation_hit)
+                            
+                            # Accumulate response for history
+                            accumulated_response += response_chunk
+                            units = self.segmenter.push(response_chunk)
+                        segmenter_time += time.monotonic() - segment_start
+                        if units:
+                            trace.add("segmenter", segment_start, time.monotonic(), units=len(units))
                         
-                    # Accumulate response for history
-                    accumulated_response += response_chunk
-                    
-                    # Stream to TTS and check for interruption
-                    completed = self.tts.synthesize(response_chunk)
-                    if not completed:
-                        was_interrupted = True
-                        break
+                        # Stream each completed unit to TTS and check for interruption
+                        for unit in units:
+                            if not self.tts.synthesize(unit, self.tts_language):
+                                was_interrupted = True
+                                break
+                        if was_interrupted:
+                            break
+                
+                if not was_interrupted:
+                    for unit in self.segmenter.flush():
+                        was_interrupted = not self.tts.synthesize(unit, self.tts_language)
+                
+                # Synthesis is asynchronous; let the answer finish before listening again
+                if not was_interrupted:
+                    was_interrupted = not self.tts.wait_for_playback()
+                
+                # Token counts are of what the model generated, not of what was heard
+                self.trace_response(trace, llm_start, last_chunk_time, segmenter_time, accumulated_response)
+                if was_interrupted:
+                    # The model should only remember what the candidate actually heard
+                    heard = self.tts.heard_text()
+                    self.response_reader.after_close(lambda: self.llm.record_interruption(heard))
+                    accumulated_response = f"{heard} {INTERRUPTION_MARKER}".lstrip()
+                
+                trace.set(
+                    interrupted=was_interrupted,
+                    speculative=speculation_hit,
+                    filler=filler["phrase"] if filler else None
+                )
+                trace.add("turn", trace.start, time.monotonic())
+                self.tracer.finish_turn(trace)
                 
                 # Save to conversation history
                 self.conversation_history.append({
@@ -169,26 +388,30 @@ class RecruiterPipeline:
                 })
                 
                 # Calculate total latency
-                total_time = time.time() - turn_start
+                total_time = trace.duration("turn")
                 
                 # Save latency information
                 self.latency_history.append({
                     "stt": stt_time,
                     "first_response": first_response_time,
                     "total": total_time,
-                    "interrupted": was_interrupted
+                    "interrupted": was_interrupted,
+                    "filler": filler["phrase"] if filler else None,
+                    "filler_cut": filler is not None and self.tts.filler_cut,
+                    "speculative": speculation_hit
                 })
                 
                 # Print current turn latency
                 print(f"\nTurn {len(self.latency_history)} Latencies:")
                 print(f"  STT Time: {stt_time:.2f}s")
-                print(f"  First Response Time: {first_response_time:.2f}s")
+                if first_response_time is not None:
+                    print(f"  First Response Time: {first_response_time:.2f}s")
                 print(f"  Total Time: {total_time:.2f}s")
                 if was_interrupted:
                     print("  (Response was interrupted)")
                 
                 # Check if we should exit
-                if hasattr(accumulated_response, 'get') and accumulated_response.get('should_exit', False):
+                if self.llm.should_exit:
                     print("\nInterview completed. Saving conversation history...")
                     self.save_conversation()
                     print("Thank you for participating in the interview!")
@@ -202,11 +425,27 @@ class RecruiterPipeline:
         finally:
             # Cleanup
             self.tts.stop_playback()
+            self.wav_writer.close()
+            self.stt.close()
+            self.llm.close()
+            self.tts.close()
+            self.audio_engine.close()
+
+
+def main():
+    # Constructors are cheap; models and clients are loaded by the background warm-up
+    audio_engine = AudioEngine(
+        input_device=os.getenv("AUDIO_INPUT_DEVICE", 1),
+        output_device=os.getenv("AUDIO_OUTPUT_DEVICE")
+    )
+    audio_engine.start()
+    stt = create_stt(os.getenv("STT_BACKEND", "whisper"))
+    llm = OpenAILLM()
+    tts = StreamingGoogleTTS(audio_engine)
+    
+    pipeline = RecruiterPipeline(stt, llm, tts, audio_engine, fillers=FillerBank(tts))
+    pipeline.run_conversation()
 
-# Correct: instantiate each module
-stt = WhisperSTT()
-llm = OpenAILLM()
-tts = StreamingGoogleTTS()
 
-pipeline = RecruiterPipeline(stt, llm, tts)
-pipeline.run_conversation()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+'''
+This file contains the InterviewServer, which hosts many concurrent interviews
+in one process. Each TCP connection is one candidate streaming framed PCM
+(see core/audio/network_io.py) and gets its own ConversationEngine, so
+history, VAD state and capture buffers are per session. The expensive pieces
+are loaded once and shared by all sessions: the STT model, the async OpenAI
+client and the TTS client.
+
+Admission control keeps the host from thrashing. At most `max_sessions`
+interviews run at once and further connections wait in line (they are told
+their queue position). At most `max_concurrent_stt` transcriptions run at
+once across all sessions.
+'''
+
+import argparse
+import asyncio
+import os
+
+from core.audio.network_io import NetworkAudioIO
+from core.engine import ConversationEngine
+from core.stt.base_stt import BaseSTT
+from core.warmup import warm_up
+
+
+class SessionSTT(BaseSTT):
+    """Per-session view of the shared STT that waits for a global transcription slot."""
+
+    def __init__(self, stt: BaseSTT, slots: asyncio.Semaphore):
+        self.stt = stt
+        self.slots = slots
+
+    @property
+    def detected_language(self):
+        """The session's language, used to pick fillers."""
+        return getattr(self.stt, "detected_language", None)
+
+    @property
+    def last_timings(self):
+        return self.stt.last_timings
+
+    def reset_language(self):
+        self.stt.reset_language()
+
+    def transcribe(self, audio_path):
+        return self.stt.transcribe(audio_path)
+
+    def transcribe_array(self, audio, sample_rate):
+        return self.stt.transcribe_array(audio, sample_rate)
+
+    def transcribe_partial(self, audio, sample_rate):
+        return self.stt.transcribe_partial(audio, sample_rate)
+
+    def transcribe_segments(self, audio, sample_rate, prompt=None, partial=False):
+        return self.stt.transcribe_segments(audio, sample_rate, prompt, partial)
+
+    async def transcribe_array_async(self, audio, sample_rate):
+        async with self.slots:
+            return await self.stt.transcribe_array_async(audio, sample_rate)
+
+
+class InterviewServer:
+    def __init__(self, stt: BaseSTT, tts, llm_factory, host="127.0.0.1", port=8765,
+                 max_sessions=4, max_concurrent_stt=2, language="hi-IN", fillers=None):
+        self.stt = stt
+        self.tts = tts
+        self.fillers = fillers
+        self.llm_factory = llm_factory  # Returns a fresh LLM (with its own history) per session
+        self.host = host
+        self.port = port
+        self.language = language
+        self.max_sessions = max_sessions
+        self.admission = asyncio.Semaphore(max_sessions)
+        self.stt_slots = asyncio.Semaphore(max_concurrent_stt)
+        self.active_sessions = 0
+        self.waiting_sessions = 0
+        self.next_session_id = 1
+
+    async def handle_connection(self, reader, writer):
+        session_id = self.next_session_id
+        self.next_session_id += 1
+        audio_io = NetworkAudioIO(reader, writer, output_rate=self.tts.sample_rate)
+
+        self.waiting_sessions += 1
+        admitted = False
+        try:
+            if self.admission.locked():
+                audio_io.send_event("queued", position=self.waiting_sessions)
+                print(f"Session {session_id} queued ({self.waiting_sessions} waiting)")
+            async with self.admission:
+                admitted = True
+                self.waiting_sessions -= 1
+                self.active_sessions += 1
+                try:
+                    await self.run_session(session_id, audio_io)
+                finally:
+                    self.active_sessions -= 1
+        finally:
+            if not admitted:
+                self.waiting_sessions -= 1
+            audio_io.close()
+
+    async def run_session(self, session_id, audio_io):
+        print(f"Session {session_id} started ({self.active_sessions}/{self.max_sessions} active)")
+        audio_io.send_event("started", session=session_id)
+        engine = ConversationEngine(
+            SessionSTT(self.stt.for_session(), self.stt_slots),
+            self.llm_factory(),
+            self.tts,
+            audio_io,
+            language=self.language,
+            fillers=self.fillers
+        )
+        try:
+            await engine.run()
+        except Exception as e:
+            print(f"Session {session_id} failed: {e}")
+        finally:
+            # The LLM is the session's own; STT and TTS are shared and stay open
+            engine.llm.close()
+            print(f"Session {session_id} ended after {len(engine.latency_history)} turns")
+
+    async def serve(self):
+        server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        print(f"Interview server listening on {self.host}:{self.port}")
+        async with server:
+            await server.serve_forever()
+
+
+async def main(args):
+    from core import transport
+    from core.llm.openai_llm import OpenAILLM
+    from core.stt.registry import create_stt
+    from core.tts.fillers import FillerBank
+    from core.tts.google_tts_2 import GoogleTTS
+
+    # Heavy resources are created once and shared by every session
+    stt = create_stt(args.stt_backend)
+    tts = GoogleTTS()
+    fillers = FillerBank(tts)
+    async_client = transport.async_openai_client()
+    # Sessions share these, so warm them once before accepting candidates
+    await asyncio.to_thread(warm_up, stt, tts, fillers)
+
+    server = InterviewServer(
+        stt,
+        tts,
+        lambda: OpenAILLM(async_client=async_client),
+        host=args.host,
+        port=args.port,
+        max_sessions=args.max_sessions,
+        max_concurrent_stt=args.max_concurrent_stt,
+        fillers=fillers
+    )
+    await server.serve()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-sessions", type=int, default=4, help="interviews running at once")
+    parser.add_argument("--max-concurrent-stt", type=int, default=2, help="transcriptions running at once; whisper-batched batches up to this many, in-process whisper runs one at a time")
+    parser.add_argument("--stt-backend", type=str, default=os.getenv("STT_BACKEND", "whisper"))
+    args = parser.parse_args()
+    asyncio.run(main(args))
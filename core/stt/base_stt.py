@@ -1,8 +1,103 @@
 # Description: This file contains the abstract class for the Speech to Text (STT) module.
 
+import asyncio
+import copy
+import threading
 from abc import ABC, abstractmethod
+import numpy as np
 
 class BaseSTT(ABC):
+    @property
+    def last_timings(self):
+        """Internal steps of the calling thread's last transcription, {"name": (start, end)}.
+
+        Times are time.monotonic() seconds. Kept per thread, so a partial or
+        streaming decode on another thread does not overwrite them. Empty for
+        backends that do not time their steps.
+        """
+        local = getattr(self, "timings_local", None)
+        return getattr(local, "timings", {}) if local is not None else {}
+
+    def start_timings(self):
+        """Reset the calling thread's timings at the start of a transcription and return them."""
+        local = self.__dict__.setdefault("timings_local", threading.local())
+        local.timings = {}
+        return local.timings
+
+    def load(self):
+        """Load the model. Idempotent; constructors only store configuration.
+
+        Transcription calls load() on demand, so calling it up front only
+        moves the cost to startup.
+        """
+        pass
+
+    def warmup(self):
+        """Load and run one dummy utterance so the first real turn skips first-inference costs."""
+        self.load()
+        self.transcribe_array(np.zeros(16000, dtype=np.float32), 16000)
+        # Whatever was "detected" in silence must not stick to the session
+        self.reset_language()
+
+    def reset_language(self):
+        """Forget the session language, e.g. at the start of a new interview.
+
+        Applies to backends that keep a `language_cache` and `detected_language`;
+        others have no language state and ignore it.
+        """
+        if getattr(self, "language_cache", None) is not None:
+            self.language_cache.reset()
+            self.detected_language = None
+
+    def close(self):
+        """Release the model and any worker threads or processes."""
+        pass
+
     @abstractmethod
     def transcribe(self, audio_path: str) -> str:
         pass
+
+    @abstractmethod
+    def transcribe_array(self, audio: np.ndarray, sample_rate: int) -> str:
+        pass
+
+    def transcribe_partial(self, audio: np.ndarray, sample_rate: int):
+        """Transcribe a partial utterance for speculation; None if that would mean waiting.
+
+        Backends whose model runs one transcription at a time return None
+        while it is busy, so a partial never delays a final transcription.
+        """
+        return " ".join(segment["text"] for segment in self.transcribe_segments(audio, sample_rate, partial=True))
+
+    def transcribe_segments(self, audio: np.ndarray, sample_rate: int, prompt: str = None,
+                            partial: bool = False) -> list:
+        """Transcribe a buffer into a list of {"start", "end", "text"} segments (seconds).
+
+        Backends without timestamps return the whole buffer as a single segment.
+        partial=True marks a decode of an unfinished utterance, which does not
+        count as a turn for the language cache.
+        """
+        text = self.transcribe_array(audio, sample_rate)
+        if not text:
+            return []
+        return [{"start": 0.0, "end": len(audio) / sample_rate, "text": text}]
+
+    async def transcribe_array_async(self, audio: np.ndarray, sample_rate: int) -> str:
+        """Async transcription; the default runs transcribe_array on a worker thread."""
+        return await asyncio.to_thread(self.transcribe_array, audio, sample_rate)
+
+    def for_session(self) -> "BaseSTT":
+        """Return an STT for one interview that shares this instance's model.
+
+        Stateless backends return themselves. Backends with a `language_cache`
+        return a shallow copy sharing the loaded model, with a fresh cache.
+        """
+        if getattr(self, "language_cache", None) is None:
+            return self
+        # Load first so that sessions share one model instead of each loading their own
+        self.load()
+        session = copy.copy(self)
+        session.language_cache = copy.copy(self.language_cache)
+        session.reset_language()
+        session.__dict__.pop("timings_local", None)
+        return session
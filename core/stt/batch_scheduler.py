@@ -0,0 +1,221 @@
+'''
+Description: Batched Whisper inference shared by concurrent interview sessions.
+When many interviews run on one host, each session used to run the encoder
+and decoder on its own utterance, padded to 30 s, and the sessions competed
+for cores. The WhisperBatchScheduler collects the utterances that arrive
+within a few milliseconds of each other. It stacks their mel spectrograms
+and runs them through the encoder, language detection and the decoder as
+one batch on a single inference thread.
+
+A batch is closed when it reaches max_batch_size, when the oldest request
+has waited max_wait seconds, or when waiting longer would make the most
+urgent request miss its deadline. Requests are served earliest deadline
+first.
+'''
+
+import asyncio
+import concurrent.futures
+import heapq
+import itertools
+import threading
+import time
+
+import torch
+import whisper
+
+from core.stt import whisper_decoding
+from core.stt.base_stt import BaseSTT
+from core.stt.language_cache import LanguageCache
+from core.stt.whisper_stt import WhisperSTT
+
+
+class WhisperBatchScheduler:
+    def __init__(self, stt: WhisperSTT, max_batch_size=8, max_wait=0.01):
+        self.stt = stt
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.pending = []  # Heap of (deadline, sequence, request)
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+        # Running estimate of how long one batch takes, used to flush ahead of deadlines
+        self.batch_seconds = 0.0
+        self.batches_run = 0
+        self.requests_run = 0
+        self.closed = False
+        self.worker = threading.Thread(target=self.inference_worker, daemon=True)
+        self.worker.start()
+
+    def submit(self, audio, language_cache, prompt=None, deadline=None, partial=False):
+        """Queue a mono float32 16 kHz utterance; returns a concurrent.futures.Future.
+
+        `deadline` is a time.monotonic() timestamp by which the result is wanted.
+        """
+        now = time.monotonic()
+        request = {
+            "audio": audio,
+            "language_cache": language_cache,
+            "prompt": prompt,
+            "partial": partial,  # Does not count as a language cache turn
+            "submitted": now,
+            "deadline": deadline if deadline is not None else now + 1.0,
+            "future": concurrent.futures.Future(),
+        }
+        with self.condition:
+            if self.closed:
+                raise RuntimeError("Batch scheduler is closed")
+            heapq.heappush(self.pending, (request["deadline"], next(self.sequence), request))
+            self.condition.notify()
+        return request["future"]
+
+    def next_batch(self):
+        """Block until a batch is ready and pop it, or return None once closed."""
+        with self.condition:
+            while not self.pending and not self.closed:
+                self.condition.wait()
+            while not self.closed and len(self.pending) < self.max_batch_size:
+                oldest = min(item[2]["submitted"] for item in self.pending)
+                urgent = self.pending[0][0]
+                flush_at = min(oldest + self.max_wait, urgent - self.batch_seconds)
+                timeout = flush_at - time.monotonic()
+                if timeout <= 0:
+                    break
+                self.condition.wait(timeout)
+            if not self.pending:
+                return None
+            count = min(len(self.pending), self.max_batch_size)
+            return [heapq.heappop(self.pending)[2] for _ in range(count)]
+
+    def inference_worker(self):
+        while True:
+            batch = self.next_batch()
+            if batch is None:
+                break
+            start = time.monotonic()
+            try:
+                results = self.run_batch(batch)
+            except Exception as e:
+                print(f"Batched transcription failed: {e}")
+                for request in batch:
+                    request["future"].set_exception(e)
+                continue
+            elapsed = time.monotonic() - start
+            self.batch_seconds = elapsed if self.batches_run == 0 else 0.8 * self.batch_seconds + 0.2 * elapsed
+            self.batches_run += 1
+            self.requests_run += len(batch)
+
+            for request, result in zip(batch, results):
+                late = time.monotonic() - request["deadline"]
+                if late > 0:
+                    print(f"Transcription finished {late:.2f}s past its deadline")
+                request["future"].set_result(result)
+
+    def run_batch(self, batch):
+        """Transcribe a batch; returns one run_transcription-style dict per request."""
+        stt = self.stt
+        stt.load()
+        results = [None] * len(batch)
+
+        windowed = []
+        for i, request in enumerate(batch):
+            audio = request["audio"]
+            if len(audio) > whisper.audio.N_SAMPLES:
+                # Long recordings need model.transcribe's sliding window and are run on their own
+                language = request["language_cache"].resolve(lambda: stt.detect_language(audio), request["partial"])
+                result = stt.model.transcribe(
+                    audio,
+                    language=language,
+                    initial_prompt=request["prompt"],
+                    beam_size=stt.beam_size,
+                    fp16=stt.fp16
+                )
+                results[i] = {**result, "language": language}
+            else:
+                windowed.append(i)
+        if not windowed:
+            return results
+
+        # With bucketed padding the batch shares the longest item's window
+        n_samples = max(stt.window_samples(batch[i]["audio"]) for i in windowed)
+        mel = torch.stack([stt.preprocess_audio(batch[i]["audio"], n_samples) for i in windowed])
+        features = whisper_decoding.encode(stt.model, mel)
+
+        # Detect the language only for sessions whose cache needs it, in one pass
+        detect = [k for k, i in enumerate(windowed) if batch[i]["language_cache"].needs_detection()]
+        detected = {}
+        if detect:
+            found = whisper_decoding.detect_language_from_features(stt.model, features[detect], stt.tokenizer)
+            detected = dict(zip(detect, found))
+        languages = [
+            batch[i]["language_cache"].resolve(lambda k=k: detected[k], batch[i]["partial"])
+            for k, i in enumerate(windowed)
+        ]
+
+        # decode_features batches items by language; a prompt is shared by the whole call
+        for prompt in set(batch[i]["prompt"] for i in windowed):
+            group = [k for k, i in enumerate(windowed) if batch[i]["prompt"] == prompt]
+            decoded = whisper_decoding.decode_features(
+                stt.model, features[group], [languages[k] for k in group], prompt=prompt,
+                fp16=stt.fp16, beam_size=stt.beam_size
+            )
+            for k, result in zip(group, decoded):
+                request = batch[windowed[k]]
+                duration = len(request["audio"]) / whisper.audio.SAMPLE_RATE
+                results[windowed[k]] = whisper_decoding.transcription(result, stt.tokenizer, duration, languages[k])
+        return results
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.worker.join()
+
+
+class BatchedWhisperSTT(BaseSTT):
+    """WhisperSTT front end whose transcriptions go through a shared WhisperBatchScheduler.
+
+    One instance loads the model; for_session() hands each interview a view
+    with its own language cache that submits to the same scheduler.
+    """
+
+    def __init__(self, max_batch_size=8, max_wait=0.01, deadline=1.0, **whisper_kwargs):
+        self.whisper = WhisperSTT(**whisper_kwargs)
+        self.scheduler = WhisperBatchScheduler(self.whisper, max_batch_size, max_wait)
+        self.deadline = deadline  # Seconds after submission by which a result is wanted
+        self.language_cache = LanguageCache(
+            self.whisper.language_cache.confidence_threshold,
+            self.whisper.language_cache.recheck_interval
+        )
+        self.detected_language = None
+
+    def load(self):
+        self.whisper.load()
+
+    def submit(self, audio, sample_rate, prompt=None, partial=False):
+        audio = self.whisper.to_whisper_audio(audio, sample_rate)
+        return self.scheduler.submit(audio, self.language_cache, prompt, time.monotonic() + self.deadline, partial)
+
+    def finish(self, result):
+        self.detected_language = result["language"]
+        return result["text"].strip()
+
+    def transcribe(self, audio_path):
+        return self.transcribe_array(whisper.load_audio(audio_path), whisper.audio.SAMPLE_RATE)
+
+    def transcribe_array(self, audio, sample_rate):
+        return self.finish(self.submit(audio, sample_rate).result())
+
+    async def transcribe_array_async(self, audio, sample_rate):
+        # The scheduler thread does the work; no executor thread is tied up while waiting
+        return self.finish(await asyncio.wrap_future(self.submit(audio, sample_rate)))
+
+    def transcribe_segments(self, audio, sample_rate, prompt=None, partial=False):
+        result = self.submit(audio, sample_rate, prompt, partial).result()
+        self.detected_language = result["language"]
+        return [
+            {"start": seg["start"], "end": seg["end"], "text": seg["text"].strip()}
+            for seg in result["segments"]
+            if seg["text"].strip()
+        ]
+
+    def close(self):
+        self.scheduler.close()
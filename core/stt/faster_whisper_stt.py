@@ -0,0 +1,74 @@
+'''
+Description: This is the subclass of the BaseSTT class.
+It uses faster-whisper (CTranslate2) to run quantized Whisper models, which
+are several times faster than openai-whisper on CPU-only hosts. Smaller-decoder
+checkpoints such as "large-v3-turbo" load through the same class; the
+distil-* checkpoints are English-only and will not transcribe Hindi.
+'''
+
+import os
+from core.audio.pcm import to_mono_float32
+from core.stt.base_stt import BaseSTT
+from core.stt.language_cache import LanguageCache
+
+SAMPLE_RATE = 16000
+
+class FasterWhisperSTT(BaseSTT):
+    def __init__(self, model_size="medium", device="cpu", compute_type="int8", num_threads=0,
+                 beam_size=1, language_confidence=0.8, language_recheck_interval=5):
+        self.model_size = model_size
+        self.device = device
+        self.compute_type = compute_type
+        self.num_threads = num_threads
+        self.model = None  # Loaded by load()
+        self.beam_size = beam_size
+        self.language_cache = LanguageCache(language_confidence, language_recheck_interval)
+        self.detected_language = None
+
+    def load(self):
+        if self.model is not None:
+            return
+        from faster_whisper import WhisperModel
+        self.model = WhisperModel(
+            self.model_size,
+            device=self.device,
+            compute_type=self.compute_type,
+            cpu_threads=self.num_threads
+        )
+
+    def transcribe(self, audio_path):
+        print(f"[DEBUG] Transcribing: {audio_path}")
+        if not os.path.exists(audio_path):
+            raise FileNotFoundError(f"Audio file missing: {audio_path}")
+        return " ".join(segment["text"] for segment in self.run_transcription(audio_path))
+
+    def transcribe_array(self, audio, sample_rate):
+        """Transcribe an in-memory PCM buffer without touching the disk."""
+        return " ".join(segment["text"] for segment in self.transcribe_segments(audio, sample_rate))
+
+    def transcribe_segments(self, audio, sample_rate, prompt=None, partial=False):
+        """Transcribe an in-memory buffer into timestamped segments."""
+        return self.run_transcription(to_mono_float32(audio, sample_rate, SAMPLE_RATE), prompt, partial)
+
+    def run_transcription(self, audio, prompt=None, partial=False):
+        """Run the model, letting it detect the language only when the cache needs it."""
+        self.load()
+        language = None if self.language_cache.needs_detection() else self.language_cache.language
+        segments, info = self.model.transcribe(
+            audio,
+            language=language,
+            beam_size=self.beam_size,
+            initial_prompt=prompt
+        )
+        # Segments are generated lazily; consume them before reading the language
+        segments = [
+            {"start": seg.start, "end": seg.end, "text": seg.text.strip()}
+            for seg in segments
+            if seg.text.strip()
+        ]
+        if language is None:
+            self.language_cache.observe(info.language, info.language_probability)
+        else:
+            self.language_cache.count_turn(partial)
+        self.detected_language = info.language
+        return segments
@@ -0,0 +1,50 @@
+'''
+Description: Session-level cache for the detected spoken language.
+Once a language has been detected with enough confidence, later turns reuse it
+and skip detection, re-checking every `recheck_interval` turns in case the
+candidate switches language. Partial decodes of an utterance still in
+progress (streaming or speculative) reuse the cache without counting as turns.
+'''
+
+
+class LanguageCache:
+    def __init__(self, confidence_threshold=0.8, recheck_interval=5):
+        self.confidence_threshold = confidence_threshold
+        self.recheck_interval = recheck_interval
+        self.language = None
+        self.turns_since_check = 0
+
+    def needs_detection(self):
+        """Whether the next turn should run language detection."""
+        return self.language is None or self.turns_since_check >= self.recheck_interval
+
+    def resolve(self, detect, partial=False):
+        """Return the language for this turn, calling `detect()` only when needed.
+
+        `detect` must return a (language, probability) tuple. Pass partial=True
+        for decodes of an unfinished utterance.
+        """
+        if not self.needs_detection():
+            self.count_turn(partial)
+            return self.language
+
+        language, probability = detect()
+        self.observe(language, probability)
+        return language
+
+    def count_turn(self, partial=False):
+        """Count a turn that reused the cached language."""
+        if not partial:
+            self.turns_since_check += 1
+
+    def observe(self, language, probability):
+        """Record a detection result made elsewhere, e.g. inside a backend's decoder."""
+        print(f"Detected language: {language} (p={probability:.2f})")
+        if probability >= self.confidence_threshold:
+            self.language = language
+            self.turns_since_check = 0
+
+    def reset(self):
+        """Forget the cached language, e.g. at the start of a new interview."""
+        self.language = None
+        self.turns_since_check = 0
@@ -0,0 +1,184 @@
+'''
+Description: Out-of-process STT worker pool.
+A long CPU decode in the main process holds the GIL for long stretches and
+starves the audio callbacks and the interrupt detector. ProcessPoolSTT runs
+any registered STT backend in a pool of spawned worker processes. Each worker
+loads and warms its own copy of the model once and is limited to a set
+number of torch threads, so STT scales across cores independently of the
+rest of the pipeline.
+
+Audio is handed to the workers through multiprocessing.shared_memory instead
+of being pickled through the pool's pipe. The session's language cache stays
+in the main process: its state is sent with each request and the worker's
+updated state is copied back.
+'''
+
+import asyncio
+import multiprocessing
+import os
+import queue
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from core.audio.pcm import to_mono_float32
+from core.stt.base_stt import BaseSTT
+from core.stt.language_cache import LanguageCache
+
+SAMPLE_RATE = 16000
+
+# The STT instance owned by this worker process, created by init_worker
+worker_stt = None
+
+
+def init_worker(backend, torch_threads, backend_kwargs, ready):
+    """Pool initializer: load the backend's model and run one warm-up transcription."""
+    global worker_stt
+    if torch_threads:
+        os.environ["OMP_NUM_THREADS"] = str(torch_threads)
+        try:
+            import torch
+            torch.set_num_threads(torch_threads)
+        except ImportError:
+            pass
+
+    from core.stt.registry import create_stt
+    worker_stt = create_stt(backend, **backend_kwargs)
+    worker_stt.warmup()
+    print(f"STT worker {os.getpid()} ready ({backend})")
+    ready.put(os.getpid())
+
+
+def noop():
+    pass
+
+
+def transcribe_in_worker(shm_name, n_samples, prompt, language_state, partial=False):
+    """Transcribe audio from shared memory; returns (segments, language_state, detected_language)."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        # Copy out so the segment can be closed whatever the backend keeps hold of
+        audio = np.ndarray((n_samples,), dtype=np.float32, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+
+    cache = getattr(worker_stt, "language_cache", None)
+    if cache is not None:
+        vars(cache).update(language_state)
+    segments = worker_stt.transcribe_segments(audio, SAMPLE_RATE, prompt, partial)
+    if cache is not None:
+        language_state = dict(vars(cache))
+    return segments, language_state, getattr(worker_stt, "detected_language", None)
+
+
+class ProcessPoolSTT(BaseSTT):
+    def __init__(self, backend="whisper", workers=2, torch_threads=None,
+                 language_confidence=0.8, language_recheck_interval=5, **backend_kwargs):
+        """Start `workers` processes that each load `backend` from the STT registry.
+
+        Remaining keyword arguments (model_size, compute_type, ...) are passed
+        to the backend in every worker.
+        """
+        self.backend = backend
+        self.workers = workers
+        self.torch_threads = torch_threads
+        self.backend_kwargs = {
+            "language_confidence": language_confidence,
+            "language_recheck_interval": language_recheck_interval,
+            **backend_kwargs,
+        }
+        self.executor = None  # Started by load()
+        self.language_cache = LanguageCache(language_confidence, language_recheck_interval)
+        self.detected_language = None
+
+    def load(self):
+        """Start every worker and wait until each has loaded and warmed its model."""
+        if self.executor is not None:
+            return
+        # Spawn, not fork: forking a process that holds torch threads and audio streams is unsafe
+        context = multiprocessing.get_context("spawn")
+        self.ready = context.Queue()
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=init_worker,
+            initargs=(self.backend, self.torch_threads, self.backend_kwargs, self.ready)
+        )
+        # The pool spawns a worker per submission while none is idle
+        futures = [self.executor.submit(noop) for _ in range(self.workers)]
+        warm = 0
+        while warm < self.workers:
+            try:
+                self.ready.get(timeout=1.0)
+                warm += 1
+            except queue.Empty:
+                # A worker whose initializer raised breaks the pool and fails the futures
+                failed = [future for future in futures if future.done() and future.exception()]
+                if failed:
+                    error = failed[0].exception()
+                    self.close()
+                    raise RuntimeError(f"STT workers failed to start: {error}") from error
+        for future in futures:
+            future.result()
+        print(f"{self.workers} STT worker(s) warm")
+
+    def warmup(self):
+        # Workers warm their own models as they start
+        self.load()
+
+    def submit(self, audio, sample_rate, prompt=None, partial=False):
+        """Copy audio into shared memory and queue it on the pool.
+
+        Returns (future, shm); the caller unlinks the segment once the future is done.
+        """
+        self.load()
+        audio = to_mono_float32(audio, sample_rate, SAMPLE_RATE)
+        shm = shared_memory.SharedMemory(create=True, size=max(audio.nbytes, 1))
+        np.ndarray(audio.shape, dtype=np.float32, buffer=shm.buf)[:] = audio
+        try:
+            future = self.executor.submit(
+                transcribe_in_worker, shm.name, len(audio), prompt, dict(vars(self.language_cache)), partial
+            )
+        except Exception:
+            self.release(shm)
+            raise
+        return future, shm
+
+    def release(self, shm):
+        shm.close()
+        shm.unlink()
+
+    def finish(self, result):
+        segments, language_state, detected_language = result
+        vars(self.language_cache).update(language_state)
+        self.detected_language = detected_language
+        return segments
+
+    def transcribe(self, audio_path):
+        import whisper
+        return self.transcribe_array(whisper.load_audio(audio_path), SAMPLE_RATE)
+
+    def transcribe_segments(self, audio, sample_rate, prompt=None, partial=False):
+        future, shm = self.submit(audio, sample_rate, prompt, partial)
+        try:
+            return self.finish(future.result())
+        finally:
+            self.release(shm)
+
+    def transcribe_array(self, audio, sample_rate):
+        return " ".join(segment["text"] for segment in self.transcribe_segments(audio, sample_rate))
+
+    async def transcribe_array_async(self, audio, sample_rate):
+        # Waiting on the pool's future does not tie up an executor thread
+        future, shm = self.submit(audio, sample_rate)
+        try:
+            segments = self.finish(await asyncio.wrap_future(future))
+        finally:
+            self.release(shm)
+        return " ".join(segment["text"] for segment in segments)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
@@ -0,0 +1,39 @@
+'''
+Description: Registry of Speech-to-Text backends keyed by name.
+Backends are imported only when created, so selecting one backend does not
+require the dependencies of the others to be installed.
+'''
+
+import importlib
+from core.stt.base_stt import BaseSTT
+
+# name -> (module, class name, default constructor arguments)
+STT_BACKENDS = {
+    "whisper": ("core.stt.whisper_stt", "WhisperSTT", {}),
+    "faster-whisper": ("core.stt.faster_whisper_stt", "FasterWhisperSTT", {}),
+    # Pruned-decoder large-v3; multilingual, unlike the English-only distil-large-v3
+    "whisper-turbo": ("core.stt.faster_whisper_stt", "FasterWhisperSTT", {"model_size": "large-v3-turbo"}),
+    "whisper-trimmed": ("core.stt.whisper_stt", "WhisperSTT", {"pad_mode": "bucket"}),
+    "whisper-batched": ("core.stt.batch_scheduler", "BatchedWhisperSTT", {}),
+    # Out-of-process pools; run from a script guarded by `if __name__ == "__main__"` (spawn re-imports it)
+    "whisper-pool": ("core.stt.process_pool_stt", "ProcessPoolSTT", {"backend": "whisper"}),
+    "faster-whisper-pool": ("core.stt.process_pool_stt", "ProcessPoolSTT", {"backend": "faster-whisper"}),
+}
+
+
+def register_stt_backend(name, module, class_name, **defaults):
+    """Register a BaseSTT implementation under `name`."""
+    STT_BACKENDS[name] = (module, class_name, defaults)
+
+
+def create_stt(backend="whisper", **kwargs) -> BaseSTT:
+    """Instantiate the STT backend registered as `backend`.
+
+    Keyword arguments (model_size, compute_type, num_threads, beam_size, ...)
+    override the backend's registered defaults.
+    """
+    if backend not in STT_BACKENDS:
+        raise ValueError(f"Unknown STT backend '{backend}'. Available: {', '.join(STT_BACKENDS)}")
+    module, class_name, defaults = STT_BACKENDS[backend]
+    stt_class = getattr(importlib.import_module(module), class_name)
+    return stt_class(**{**defaults, **kwargs})
@@ -0,0 +1,103 @@
+'''
+Description: Incremental transcription while the candidate is still speaking.
+A worker thread reads the capture ring buffer and re-transcribes the
+uncommitted part of the recording every `step_seconds` of new audio. Segments that two consecutive passes agree on
+(excluding the final, still-changing segment) are committed, and the window
+start moves past them, so later passes only re-decode the unstable tail.
+When the turn ends, finish() decodes whatever tail is left.
+'''
+
+import threading
+from core.audio.ring_buffer import AudioRingBuffer
+from core.stt.base_stt import BaseSTT
+
+
+class StreamingTranscriber:
+    def __init__(self, stt: BaseSTT, buffer: AudioRingBuffer, sample_rate=16000, step_seconds=1.0,
+                 min_window_seconds=1.0, tail_guard_seconds=0.5):
+        self.stt = stt
+        self.buffer = buffer
+        self.fs = sample_rate
+        self.step_samples = int(step_seconds * sample_rate)
+        self.min_window_samples = int(min_window_seconds * sample_rate)
+        # Segments ending this close to the window end are never committed
+        self.tail_guard = tail_guard_seconds
+
+        self.is_running = False
+        self.worker_thread = None
+
+        self.committed_text = []
+        self.committed_samples = 0
+        self.previous_hypothesis = []
+
+    def start(self):
+        """Reset state and start the background transcription worker.
+
+        The capture buffer must have been reset for the new turn, so that
+        absolute position 0 is the start of the utterance.
+        """
+        self.committed_text = []
+        self.committed_samples = 0
+        self.previous_hypothesis = []
+        self.is_running = True
+        self.worker_thread = threading.Thread(target=self.transcription_worker, daemon=True)
+        self.worker_thread.start()
+
+    def transcription_worker(self):
+        """Worker thread that transcribes a rolling window of the recording."""
+        processed_samples = 0
+        while True:
+            self.buffer.wait_for(
+                lambda: not self.is_running or self.buffer.total_written - processed_samples >= self.step_samples
+            )
+            if not self.is_running:
+                break
+            audio = self.buffer.read(0)
+            processed_samples = len(audio)
+            if processed_samples - self.committed_samples < self.min_window_samples:
+                continue
+            try:
+                self.advance(audio)
+            except Exception as e:
+                print(f"Streaming transcription error: {e}")
+
+    def advance(self, audio):
+        """Transcribe the uncommitted window and commit the agreed-upon prefix."""
+        window = audio[self.committed_samples:]
+        window_end = len(window) / self.fs
+        segments = self.stt.transcribe_segments(
+            window, self.fs, prompt=" ".join(self.committed_text) or None, partial=True
+        )
+
+        committed_end = 0.0
+        stable = 0
+        for i, segment in enumerate(segments[:-1]):
+            if segment["end"] > window_end - self.tail_guard:
+                break
+            if i >= len(self.previous_hypothesis) or self.previous_hypothesis[i] != segment["text"]:
+                break
+            self.committed_text.append(segment["text"])
+            committed_end = segment["end"]
+            stable = i + 1
+
+        self.committed_samples += int(committed_end * self.fs)
+        self.previous_hypothesis = [segment["text"] for segment in segments[stable:]]
+
+    def partial_text(self):
+        """Best current guess at the transcript: committed text plus the latest unconfirmed tail."""
+        return " ".join(list(self.committed_text) + list(self.previous_hypothesis)).strip()
+
+    def finish(self):
+        """Stop the worker, decode the remaining tail and return the full transcript."""
+        self.is_running = False
+        self.buffer.notify()
+        if self.worker_thread:
+            self.worker_thread.join()
+            self.worker_thread = None
+
+        tail = self.buffer.read(self.committed_samples)
+        text = list(self.committed_text)
+        if len(tail) > 0:
+            prompt = " ".join(text) or None
+            text.extend(segment["text"] for segment in self.stt.transcribe_segments(tail, self.fs, prompt=prompt))
+        return " ".join(text).strip()
@@ -0,0 +1,177 @@
+'''
+Description: Helpers for running Whisper's encoder once and sharing its output.
+whisper.detect_language and model.transcribe each compute their own log-mel
+spectrogram and run the encoder again. These helpers take encoder features
+computed once and use them for both language detection and decoding.
+
+The encoder can also run on less than 30 s of audio. Short utterances are
+padded only up to the next multiple of a bucket size rather than to the full
+window, which cuts encoder compute roughly in proportion.
+'''
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+import whisper
+from whisper.decoding import DecodingOptions, DecodingTask
+from whisper.tokenizer import get_tokenizer
+
+TIME_PRECISION = whisper.audio.N_SAMPLES_PER_TOKEN / whisper.audio.SAMPLE_RATE
+FALLBACK_TEMPERATURES = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+COMPRESSION_RATIO_THRESHOLD = 2.4
+LOGPROB_THRESHOLD = -1.0
+NO_SPEECH_THRESHOLD = 0.6
+
+
+class PrecomputedFeaturesTask(DecodingTask):
+    """DecodingTask that is handed encoder features instead of a mel spectrogram."""
+
+    def _get_audio_features(self, mel):
+        return mel
+
+
+def model_tokenizer(model):
+    """Return the tokenizer matching `model`."""
+    return get_tokenizer(model.is_multilingual, num_languages=model.num_languages)
+
+
+def log_mel(model, audio, n_samples=whisper.audio.N_SAMPLES):
+    """Pad/trim `audio` to `n_samples` and compute its log-mel spectrogram."""
+    audio = whisper.pad_or_trim(audio, n_samples)
+    return whisper.log_mel_spectrogram(audio, n_mels=model.dims.n_mels).to(model.device)
+
+
+def bucket_samples(n_samples, bucket_seconds):
+    """Round a length up to a whole number of buckets, capped at the 30 s window."""
+    bucket = int(bucket_seconds * whisper.audio.SAMPLE_RATE)
+    # Two mel frames per encoder position, so keep the length a multiple of that
+    bucket -= bucket % (2 * whisper.audio.HOP_LENGTH)
+    if bucket <= 0:
+        return whisper.audio.N_SAMPLES
+    return min(-(-max(n_samples, 1) // bucket) * bucket, whisper.audio.N_SAMPLES)
+
+
+@torch.no_grad()
+def encode(model, mel):
+    """Run the encoder once on a (n_mels, frames) or (batch, n_mels, frames) spectrogram.
+
+    Spectrograms shorter than the 30 s window go through encode_trimmed.
+    """
+    if mel.ndim == 2:
+        mel = mel.unsqueeze(0)
+    if mel.shape[-1] < whisper.audio.N_FRAMES:
+        return encode_trimmed(model.encoder, mel)
+    return model.embed_audio(mel)
+
+
+@torch.no_grad()
+def encode_trimmed(encoder, mel):
+    """AudioEncoder.forward for fewer than N_FRAMES frames.
+
+    The stock forward asserts a full 1500-position context; here the
+    positional embedding is sliced to the frames actually present.
+    """
+    x = F.gelu(encoder.conv1(mel))
+    x = F.gelu(encoder.conv2(x))
+    x = x.permute(0, 2, 1)
+    x = (x + encoder.positional_embedding[:x.shape[1]]).to(x.dtype)
+    for block in encoder.blocks:
+        x = block(x)
+    return encoder.ln_post(x)
+
+
+@torch.no_grad()
+def detect_language_from_features(model, features, tokenizer=None):
+    """Detect the spoken language from encoder features.
+
+    Returns a list of (language, probability) tuples, one per batch item.
+    """
+    tokenizer = tokenizer or model_tokenizer(model)
+    x = torch.tensor([[tokenizer.sot]] * features.shape[0]).to(features.device)
+    logits = model.logits(x, features)[:, 0]
+
+    # Only keep the language tokens
+    mask = torch.ones(logits.shape[-1], dtype=torch.bool)
+    mask[list(tokenizer.all_language_tokens)] = False
+    logits[:, mask] = -np.inf
+    probs = logits.softmax(dim=-1).cpu()
+
+    codes = dict(zip(tokenizer.all_language_tokens, tokenizer.all_language_codes))
+    return [(codes[token], probs[i, token].item()) for i, token in enumerate(logits.argmax(dim=-1).tolist())]
+
+
+def needs_fallback(result):
+    """Same quality checks model.transcribe uses before retrying at a higher temperature."""
+    if result.no_speech_prob > NO_SPEECH_THRESHOLD:
+        # Probably silence or noise; a hotter decode would only invent text
+        return False
+    if result.compression_ratio > COMPRESSION_RATIO_THRESHOLD:
+        return True
+    return result.avg_logprob < LOGPROB_THRESHOLD
+
+
+def is_silence(result):
+    """True for windows model.transcribe would skip as having no speech."""
+    return result.no_speech_prob > NO_SPEECH_THRESHOLD and result.avg_logprob < LOGPROB_THRESHOLD
+
+
+@torch.no_grad()
+def decode_features(model, features, languages, prompt=None, fp16=False, beam_size=None,
+                    temperatures=FALLBACK_TEMPERATURES):
+    """Decode a batch of encoder features, retrying failed items at higher temperatures.
+
+    `languages` holds one language code per batch item. Returns one DecodingResult per item.
+    """
+    results = [None] * features.shape[0]
+    pending = list(range(features.shape[0]))
+    for temperature in temperatures:
+        # Decode items that share a language together
+        for language in sorted(set(languages[i] for i in pending)):
+            indices = [i for i in pending if languages[i] == language]
+            options = DecodingOptions(
+                language=language,
+                prompt=prompt,
+                fp16=fp16,
+                temperature=temperature,
+                beam_size=beam_size if temperature == 0.0 else None,
+                best_of=None if temperature == 0.0 else 5,
+            )
+            task = PrecomputedFeaturesTask(model, options)
+            for i, result in zip(indices, task.run(features[indices])):
+                results[i] = result
+        pending = [i for i in pending if needs_fallback(results[i])]
+        if not pending:
+            break
+    return results
+
+
+def result_segments(result, tokenizer, duration):
+    """Split a DecodingResult's timestamp tokens into {"start", "end", "text"} segments."""
+    segments = []
+    start = None
+    text_tokens = []
+    for token in result.tokens:
+        if token < tokenizer.timestamp_begin:
+            text_tokens.append(token)
+            continue
+        timestamp = (token - tokenizer.timestamp_begin) * TIME_PRECISION
+        if start is not None and text_tokens:
+            segments.append({"start": start, "end": timestamp, "text": tokenizer.decode(text_tokens)})
+            text_tokens = []
+            start = None
+        else:
+            start = timestamp
+    if text_tokens:
+        segments.append({"start": start or 0.0, "end": duration, "text": tokenizer.decode(text_tokens)})
+    return segments
+
+
+def transcription(result, tokenizer, duration, language):
+    """A run_transcription-style dict for one window; empty if the window has no speech."""
+    if is_silence(result):
+        return {"text": "", "segments": [], "language": language}
+    return {
+        "text": result.text,
+        "segments": result_segments(result, tokenizer, duration),
+        "language": language,
+    }
@@ -1,36 +1,82 @@
 ''' 
 Description: This is the subclass of the BaseSTT class. 
 It uses the Whisper STT model to transcribe the audio.
+Importing this module imports whisper and torch; the registry only imports
+it when this backend is selected.
 '''
 
-import whisper
 from core.stt.base_stt import BaseSTT
 import os
+import threading
+import time
 import numpy as np
 import torch
+import whisper
+from core.audio.pcm import to_mono_float32
+from core.stt import whisper_decoding
+from core.stt.language_cache import LanguageCache
+
+# Same values as whisper.audio.SAMPLE_RATE and whisper.audio.N_SAMPLES
+SAMPLE_RATE = 16000
+N_SAMPLES = 30 * SAMPLE_RATE
 
 class WhisperSTT(BaseSTT):
-    def __init__(self, model_size="medium"):
-        self.model = whisper.load_model(model_size)
+    def __init__(self, model_size="medium", device=None, compute_type="float32", num_threads=None,
+                 beam_size=None, language_confidence=0.8, language_recheck_interval=5,
+                 pad_mode="full", bucket_seconds=5.0):
+        self.model_size = model_size
+        self.device = device
+        self.num_threads = num_threads
+        self.model = None  # Loaded by load()
+        self.tokenizer = None
+        self.fp16 = compute_type == "float16"
+        self.beam_size = beam_size
+        self.language_cache = LanguageCache(language_confidence, language_recheck_interval)
         self.detected_language = None
+        # "full" pads every utterance to 30 s; "bucket" pads only to the next bucket_seconds multiple
+        if pad_mode not in ("full", "bucket"):
+            raise ValueError(f"Unknown pad_mode '{pad_mode}'")
+        self.pad_mode = pad_mode
+        self.bucket_seconds = bucket_seconds
+        self.lock = threading.Lock()  # Shared with for_session copies, like the model
+        
+    def load(self):
+        if self.model is not None:
+            return
+        if self.num_threads:
+            torch.set_num_threads(self.num_threads)
+        self.model = whisper.load_model(self.model_size, device=self.device)
+        self.tokenizer = whisper_decoding.model_tokenizer(self.model)
         
-    def preprocess_audio(self, audio):
+    def window_samples(self, audio):
+        """Number of samples the encoder window is padded to for this audio."""
+        if self.pad_mode == "bucket":
+            return whisper_decoding.bucket_samples(len(audio), self.bucket_seconds)
+        return N_SAMPLES
+        
+    def preprocess_audio(self, audio, n_samples=None):
         """Preprocess audio for Whisper model."""
-        # Pad/trim audio to 30 seconds
-        audio = whisper.pad_or_trim(audio)
-        # Convert to mel spectrogram
-        mel = whisper.log_mel_spectrogram(audio)
-        return mel
-        
-    def detect_language(self, audio):
-        """Detect the language of the audio using Whisper."""
-        # Preprocess audio
-        mel = self.preprocess_audio(audio)
-        # Get language probabilities
-        _, probs = self.model.detect_language(mel)
-        # Get the most likely language
-        language = max(probs.items(), key=lambda x: x[1])[0]
-        return language
+        self.load()
+        # Pad/trim audio to the encoder window and convert to mel spectrogram
+        return whisper_decoding.log_mel(self.model, audio, n_samples or self.window_samples(audio))
+        
+    def encode_audio(self, audio):
+        """Compute the mel spectrogram and encoder output once for a single window."""
+        return whisper_decoding.encode(self.model, self.preprocess_audio(audio))
+        
+    def detect_language(self, audio, features=None):
+        """Detect the language of the audio using Whisper.
+        
+        Returns a (language, probability) tuple. Pass `features` to reuse an
+        encoder pass that has already been run.
+        """
+        if features is None:
+            features = self.encode_audio(audio)
+        return whisper_decoding.detect_language_from_features(self.model, features, self.tokenizer)[0]
+        
+    def to_whisper_audio(self, audio, sample_rate):
+        """Convert a PCM buffer to the mono float32 16 kHz array Whisper expects."""
+        return to_mono_float32(audio, sample_rate, SAMPLE_RATE)
         
     def transcribe(self, audio_path):
         print(f"[DEBUG] Transcribing: {audio_path}")
@@ -38,16 +84,76 @@ class WhisperSTT(BaseSTT):
             raise FileNotFoundError(f"Audio file missing: {audio_path}")
         
         audio = whisper.load_audio(audio_path)
+        return self.transcribe_audio(audio)
+        
+    def transcribe_array(self, audio, sample_rate):
+        """Transcribe an in-memory PCM buffer without touching the disk."""
+        return self.transcribe_audio(self.to_whisper_audio(audio, sample_rate))
+        
+    def transcribe_partial(self, audio, sample_rate):
+        """Transcribe a speculative partial only if no other transcription holds the model."""
+        if not self.lock.acquire(blocking=False):
+            return None
+        try:
+            return self.run_locked(self.to_whisper_audio(audio, sample_rate), None, partial=True)["text"].strip()
+        finally:
+            self.lock.release()
+        
+    def transcribe_segments(self, audio, sample_rate, prompt=None, partial=False):
+        """Transcribe an in-memory buffer into timestamped segments."""
+        result = self.run_transcription(self.to_whisper_audio(audio, sample_rate), prompt, partial)
+        return [
+            {"start": seg["start"], "end": seg["end"], "text": seg["text"].strip()}
+            for seg in result["segments"]
+            if seg["text"].strip()
+        ]
+        
+    def transcribe_audio(self, audio):
+        """Transcribe a mono float32 16 kHz array."""
+        return self.run_transcription(audio)["text"].strip()
+        
+    def run_transcription(self, audio, prompt=None, partial=False):
+        """Detect the language and run Whisper on a mono float32 16 kHz array.
+        
+        Utterances that fit in one 30 s window are encoded once; the encoder
+        output is shared by language detection and decoding.
+        """
         print(f"Audio array range: {np.min(audio)} to {np.max(audio)}")
+        self.load()
         
-        # Detect language if not already detected or if it's a new conversation
-        self.detected_language = self.detect_language(audio)
-        print(f"Detected language: {self.detected_language}")
+        # Decoding installs kv-cache hooks on the shared model, so only one transcription runs at a time
+        with self.lock:
+            return self.run_locked(audio, prompt, partial)
+            
+    def run_locked(self, audio, prompt, partial=False):
+        timings = self.start_timings()
+        if len(audio) > N_SAMPLES:
+            # Long recordings need model.transcribe's sliding window
+            start = time.monotonic()
+            self.detected_language = self.language_cache.resolve(
+                lambda: self.detect_language(audio), partial
+            )
+            timings["detect"] = (start, time.monotonic())
+            result = self.model.transcribe(
+                audio,
+                language=self.detected_language,
+                initial_prompt=prompt,
+                beam_size=self.beam_size,
+                fp16=self.fp16
+            )
+            timings["decode"] = (timings["detect"][1], time.monotonic())
+            return result
         
-        result = self.model.transcribe(
-            audio,
-            language=self.detected_language,
-            fp16=False
+        start = time.monotonic()
+        features = self.encode_audio(audio)
+        timings["encode"] = (start, time.monotonic())
+        self.detected_language = self.language_cache.resolve(
+            lambda: self.detect_language(audio, features), partial
         )
-        
-        return result["text"].strip()
+        timings["detect"] = (timings["encode"][1], time.monotonic())
+        result = whisper_decoding.decode_features(
+            self.model, features, [self.detected_language], prompt=prompt,
+            fp16=self.fp16, beam_size=self.beam_size
+        )[0]
+        timings["decode"] = (timings["detect"][1], time.monotonic())
+        return whisper_decoding.transcription(result, self.tokenizer, len(audio) / SAMPLE_RATE, self.detected_language)
@@ -0,0 +1,241 @@
+'''
+Description: Per-stage latency tracing and metrics export.
+Each turn gets a Trace. A Trace is a list of spans timed with
+time.monotonic(): capture, VAD end-point, STT and its encode/detect/decode
+steps, the LLM stream, the segmenter, each TTS request, first audio out,
+each sentence's playback and the gaps between sentences. Finished turns are
+appended to a JSONL file, one object per turn, with span times in seconds
+from the start of the turn.
+
+Span durations also feed Prometheus-style metrics. There are counters, and
+histograms that keep their observations so p50/p95/p99 can be reported next
+to the usual buckets. Tracer.write_metrics() writes the Prometheus text
+exposition format.
+'''
+
+import json
+import math
+import threading
+import time
+
+import numpy as np
+
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, math.inf)
+RATE_BUCKETS = (5, 10, 20, 40, 80, 160, 320, math.inf)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Trace:
+    """Spans of one turn."""
+
+    def __init__(self, turn):
+        self.turn = turn
+        self.start = time.monotonic()
+        self.wall_start = time.time()  # Only to line traces up with the recordings
+        self.spans = []  # {"name", "start", "end", **attributes}, monotonic seconds
+        self.attributes = {}
+        self.lock = threading.Lock()
+
+    def add(self, name, start, end, **attributes):
+        """Record a span from monotonic timestamps."""
+        with self.lock:
+            self.spans.append({"name": name, "start": start, "end": end, **attributes})
+
+    def span(self, name, **attributes):
+        """Context manager timing the enclosed block."""
+        return SpanTimer(self, name, attributes)
+
+    def set(self, **attributes):
+        """Turn-level attributes, e.g. token counts or whether the turn was interrupted."""
+        with self.lock:
+            self.attributes.update(attributes)
+
+    def first(self, name):
+        """The earliest span called `name`, or None."""
+        with self.lock:
+            spans = [span for span in self.spans if span["name"] == name]
+        return min(spans, key=lambda span: span["start"]) if spans else None
+
+    def duration(self, name):
+        """Total seconds spent in spans called `name`."""
+        with self.lock:
+            return sum(span["end"] - span["start"] for span in self.spans if span["name"] == name)
+
+    def to_dict(self):
+        with self.lock:
+            spans = sorted(self.spans, key=lambda span: span["start"])
+            return {
+                "turn": self.turn,
+                "wall_start": self.wall_start,
+                **self.attributes,
+                "spans": [
+                    {
+                        **span,
+                        "start": round(span["start"] - self.start, 6),
+                        "end": round(span["end"] - self.start, 6),
+                        "duration": round(span["end"] - span["start"], 6),
+                    }
+                    for span in spans
+                ],
+            }
+
+
+class SpanTimer:
+    def __init__(self, trace, name, attributes):
+        self.trace = trace
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self):
+        self.start = time.monotonic()
+        return self.attributes  # Attributes can still be added inside the block
+
+    def __exit__(self, *exc_info):
+        self.trace.add(self.name, self.start, time.monotonic(), **self.attributes)
+        return False
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.observations = []  # Kept for exact quantiles; a few per turn
+
+    def observe(self, value):
+        self.sum += value
+        self.observations.append(value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def quantile(self, q):
+        return float(np.quantile(self.observations, q)) if self.observations else None
+
+
+def format_labels(labels, **extra):
+    items = list(labels) + list(extra.items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in items) + "}"
+
+
+def format_bound(bound):
+    return "+Inf" if bound == math.inf else repr(float(bound))
+
+
+class Metrics:
+    def __init__(self, prefix="recruiter"):
+        self.prefix = prefix
+        self.families = {}  # name -> {"type", "help", "series": {labels: Counter or Histogram}}
+        self.lock = threading.Lock()
+
+    def get(self, kind, name, help_text, labels, factory):
+        name = f"{self.prefix}_{name}"
+        with self.lock:
+            family = self.families.setdefault(name, {"type": kind, "help": help_text, "series": {}})
+            key = tuple(sorted(labels.items()))
+            if key not in family["series"]:
+                family["series"][key] = factory()
+            return family["series"][key]
+
+    def counter(self, name, help_text, **labels):
+        return self.get("counter", name, help_text, labels, Counter)
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS, **labels):
+        return self.get("histogram", name, help_text, labels, lambda: Histogram(buckets))
+
+    def to_prometheus(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        with self.lock:
+            for name, family in sorted(self.families.items()):
+                lines.append(f"# HELP {name} {family['help']}")
+                lines.append(f"# TYPE {name} {family['type']}")
+                for labels, metric in sorted(family["series"].items()):
+                    if family["type"] == "counter":
+                        lines.append(f"{name}{format_labels(labels)} {metric.value:g}")
+                        continue
+                    for bound, count in zip(metric.buckets, metric.counts):
+                        lines.append(f"{name}_bucket{format_labels(labels, le=format_bound(bound))} {count}")
+                    lines.append(f"{name}_sum{format_labels(labels)} {metric.sum}")
+                    lines.append(f"{name}_count{format_labels(labels)} {len(metric.observations)}")
+        return "\n".join(lines) + "\n"
+
+    def quantiles(self):
+        """{"name{labels}": {"count", "p50", "p95", "p99"}} for every histogram."""
+        summary = {}
+        with self.lock:
+            for name, family in sorted(self.families.items()):
+                if family["type"] != "histogram":
+                    continue
+                for labels, metric in sorted(family["series"].items()):
+                    summary[f"{name}{format_labels(labels)}"] = {
+                        "count": len(metric.observations),
+                        **{f"p{int(q * 100)}": metric.quantile(q) for q in QUANTILES},
+                    }
+        return summary
+
+
+class Tracer:
+    def __init__(self, trace_path=None, metrics=None):
+        """
+        Args:
+            trace_path: JSONL file that finished turns are appended to; None keeps traces in memory only
+            metrics: Metrics to update; a new registry by default
+        """
+        self.trace_path = trace_path
+        self.metrics = metrics or Metrics()
+        self.turns = 0
+        self.lock = threading.Lock()
+
+    def start_turn(self):
+        with self.lock:
+            self.turns += 1
+            return Trace(self.turns)
+
+    def finish_turn(self, trace):
+        """Export the trace and fold it into the metrics; returns the exported dict."""
+        record = trace.to_dict()
+        if self.trace_path:
+            with self.lock, open(self.trace_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+        metrics = self.metrics
+        metrics.counter("turns_total", "Completed turns").inc()
+        if record.get("interrupted"):
+            metrics.counter("interrupted_turns_total", "Turns the candidate talked over").inc()
+        for span in record["spans"]:
+            metrics.histogram("stage_seconds", "Duration of each pipeline stage", stage=span["name"]).observe(
+                span["duration"]
+            )
+            metrics.counter("spans_total", "Spans recorded per stage", stage=span["name"]).inc()
+        if record.get("llm_tokens"):
+            metrics.counter("llm_tokens_total", "Tokens streamed by the LLM").inc(record["llm_tokens"])
+        if record.get("llm_tokens_per_second"):
+            metrics.histogram(
+                "llm_tokens_per_second", "LLM streaming rate after the first token", buckets=RATE_BUCKETS
+            ).observe(record["llm_tokens_per_second"])
+        return record
+
+    def write_metrics(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.metrics.to_prometheus())
+
+    def report(self):
+        """Lines of p50/p95/p99 per histogram, for the latency report."""
+        lines = []
+        for name, summary in self.metrics.quantiles().items():
+            if not summary["count"]:
+                continue
+            values = "  ".join(f"{q}={summary[q]:.3f}" for q in ("p50", "p95", "p99"))
+            lines.append(f"{name}: n={summary['count']}  {values}")
+        return lines
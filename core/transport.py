@@ -0,0 +1,219 @@
+'''
+Description: Shared network transport for the LLM and TTS providers.
+Every provider used to create its client with library defaults. After an
+idle period, such as the candidate thinking, the next request paid for a new
+TCP and TLS handshake. This module gives all providers:
+- pooled clients with explicit pool sizes (httpx for OpenAI, botocore for
+  Polly, a gRPC channel for Google TTS);
+- HTTP/2 when the `h2` package is installed;
+- a KeepAlive thread that sends a cheap request on any connection that has
+  been idle for `interval` seconds. gRPC channels are kept warm the same
+  way: servers answer idle protocol-level pings more often than every five
+  minutes with GOAWAY (too_many_pings), so the channel's own keepalive only
+  runs during calls, at the documented minimum interval.
+
+Endpoints can be pointed at a local stand-in server for testing:
+OPENAI_BASE_URL, POLLY_ENDPOINT_URL and GOOGLE_TTS_ENDPOINT. Set
+GOOGLE_TTS_INSECURE=1 for a plaintext gRPC stand-in.
+'''
+
+import asyncio
+import importlib.util
+import os
+import threading
+import time
+
+MAX_CONNECTIONS = 20
+MAX_KEEPALIVE_CONNECTIONS = 10
+KEEPALIVE_EXPIRY = 120.0  # Seconds an idle pooled connection is kept open
+CONNECT_TIMEOUT = 5.0
+READ_TIMEOUT = 60.0
+IDLE_PING_INTERVAL = 20.0
+
+GRPC_OPTIONS = [
+    # gRPC servers reject pings more frequent than grpc.http2.min_ping_interval_without_data_ms (5 min)
+    ("grpc.keepalive_time_ms", 300000),
+    ("grpc.keepalive_timeout_ms", 20000),
+]
+
+shared = {}
+shared_lock = threading.Lock()
+
+
+def get_shared(name, factory):
+    """Create the shared object `name` on first use."""
+    with shared_lock:
+        if name not in shared:
+            shared[name] = factory()
+        return shared[name]
+
+
+def http2_available():
+    return importlib.util.find_spec("h2") is not None
+
+
+def httpx_settings():
+    import httpx
+    return {
+        "limits": httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY
+        ),
+        "timeout": httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+        "http2": http2_available(),
+    }
+
+
+def http_client():
+    """Process-wide pooled httpx.Client."""
+    import httpx
+    return get_shared("http_client", lambda: httpx.Client(**httpx_settings()))
+
+
+def async_http_client():
+    """Pooled httpx.AsyncClient. Its connections belong to the event loop that first uses them."""
+    import httpx
+    return httpx.AsyncClient(**httpx_settings())
+
+
+def openai_client(base_url=None):
+    """OpenAI client on the shared connection pool."""
+    import openai
+    return openai.OpenAI(
+        api_key=openai.api_key,
+        base_url=base_url or os.getenv("OPENAI_BASE_URL"),
+        http_client=http_client()
+    )
+
+
+def async_openai_client(base_url=None):
+    """AsyncOpenAI client with its own pooled connections; create one per event loop."""
+    import openai
+    return openai.AsyncOpenAI(
+        api_key=openai.api_key,
+        base_url=base_url or os.getenv("OPENAI_BASE_URL"),
+        http_client=async_http_client()
+    )
+
+
+def botocore_config():
+    from botocore.config import Config
+    return Config(
+        max_pool_connections=MAX_CONNECTIONS,
+        tcp_keepalive=True,
+        connect_timeout=CONNECT_TIMEOUT,
+        read_timeout=READ_TIMEOUT,
+        retries={"max_attempts": 3, "mode": "adaptive"}
+    )
+
+
+def boto3_client(service, region_name):
+    """boto3 client with a sized pool and TCP keepalive."""
+    import boto3
+    return boto3.client(
+        service,
+        region_name=region_name,
+        endpoint_url=os.getenv(f"{service.upper()}_ENDPOINT_URL"),
+        config=botocore_config()
+    )
+
+
+def google_tts_client():
+    """TextToSpeechClient on a gRPC channel with keepalive pings enabled."""
+    from google.cloud import texttospeech
+    from google.cloud.texttospeech_v1.services.text_to_speech.transports import TextToSpeechGrpcTransport
+
+    endpoint = os.getenv("GOOGLE_TTS_ENDPOINT", TextToSpeechGrpcTransport.DEFAULT_HOST)
+    if os.getenv("GOOGLE_TTS_INSECURE"):
+        import grpc
+        from google.auth.credentials import AnonymousCredentials
+        channel = grpc.insecure_channel(endpoint, options=GRPC_OPTIONS)
+        transport = TextToSpeechGrpcTransport(host=endpoint, channel=channel, credentials=AnonymousCredentials())
+    else:
+        channel = TextToSpeechGrpcTransport.create_channel(endpoint, options=GRPC_OPTIONS)
+        transport = TextToSpeechGrpcTransport(host=endpoint, channel=channel)
+    client = texttospeech.TextToSpeechClient(transport=transport)
+    # Idle channels are kept warm with a cheap call; see GRPC_OPTIONS
+    keepalive().register(f"google-tts-{id(client)}", lambda: client.list_voices(language_code="hi-IN"))
+    return client
+
+
+def touch_google_tts_client(client):
+    """Record a real request on `client`, postponing its idle ping."""
+    keepalive().touch(f"google-tts-{id(client)}")
+
+
+def close_google_tts_client(client):
+    keepalive().unregister(f"google-tts-{id(client)}")
+    client.transport.close()
+
+
+class KeepAlive:
+    """Background thread that pings connections which have been idle too long."""
+
+    def __init__(self, interval=IDLE_PING_INTERVAL):
+        self.interval = interval
+        self.pings = {}  # name -> {"ping", "loop", "last_used", "owners"}
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def register(self, name, ping, loop=None, owner=None):
+        """Ping with `ping()` whenever `name` has been idle for `interval` seconds.
+
+        If `loop` is given, `ping` is a coroutine function run on that event loop.
+        A connection shared by several users is registered by each of them with
+        its own `owner` key and is pinged until the last one unregisters.
+        """
+        with self.lock:
+            owners = self.pings[name]["owners"] if name in self.pings else set()
+            owners.add(owner)
+            self.pings[name] = {"ping": ping, "loop": loop, "last_used": time.monotonic(), "owners": owners}
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.worker, daemon=True)
+                self.thread.start()
+
+    def unregister(self, name, owner=None):
+        """Release `owner`'s registration; the pings stop once no owner is left."""
+        with self.lock:
+            entry = self.pings.get(name)
+            if entry is None:
+                return
+            entry["owners"].discard(owner)
+            if not entry["owners"]:
+                del self.pings[name]
+
+    def touch(self, name):
+        """Record real traffic on `name`, postponing its next ping."""
+        entry = self.pings.get(name)
+        if entry is not None:
+            entry["last_used"] = time.monotonic()
+
+    def worker(self):
+        while not self.stop_event.wait(1.0):
+            now = time.monotonic()
+            with self.lock:
+                due = [(name, entry) for name, entry in self.pings.items() if now - entry["last_used"] >= self.interval]
+            for name, entry in due:
+                entry["last_used"] = now
+                try:
+                    if entry["loop"] is not None:
+                        if entry["loop"].is_closed():
+                            with self.lock:
+                                if self.pings.get(name) is entry:
+                                    del self.pings[name]
+                            continue
+                        asyncio.run_coroutine_threadsafe(entry["ping"](), entry["loop"]).result(timeout=READ_TIMEOUT)
+                    else:
+                        entry["ping"]()
+                except Exception as e:
+                    print(f"Keep-alive ping for {name} failed: {e}")
+
+    def close(self):
+        self.stop_event.set()
+
+
+def keepalive():
+    """Process-wide KeepAlive shared by all providers."""
+    return get_shared("keepalive", KeepAlive)
@@ -1,8 +1,46 @@
 # Description: This file contains the abstract class for TTS (Text to Speech) module.
 
+import asyncio
 from abc import ABC, abstractmethod
+import numpy as np
 
 class BaseTTS(ABC):
+    # Sample rate of the arrays returned by synthesize_pcm
+    sample_rate = 24000
+    # Phrase cache for synthesized audio (see core/tts/cache.py); None disables it
+    cache = None
+
+    def load(self):
+        """Create the model or API client. Idempotent; constructors only store configuration."""
+        pass
+
+    def warmup(self, language: str = "hi-IN"):
+        """Load and run one dummy synthesis, warming the model or the API connection."""
+        self.load()
+        self.synthesize_pcm("नमस्ते", language)
+
+    def close(self):
+        """Release the model or API client."""
+        pass
+
     @abstractmethod
-    def synthesize(self, text: str, language: str = "hi-IN") -> str:
+    def synthesize(self, text: str, language: str = "hi-IN"):
         pass
+
+    @abstractmethod
+    def synthesize_pcm(self, text: str, language: str = "hi-IN") -> np.ndarray:
+        """Synthesize `text` and return mono PCM samples at `sample_rate`."""
+        pass
+
+    def cached_synthesis(self, text: str, language: str, voice: str, synthesize) -> np.ndarray:
+        """Return the audio for `text`, calling `synthesize()` only on a cache miss.
+
+        Cached arrays are shared and read-only.
+        """
+        if self.cache is None:
+            return synthesize()
+        return self.cache.get_or_synthesize(text, language, voice, self.sample_rate, synthesize)
+
+    async def synthesize_async(self, text: str, language: str = "hi-IN") -> np.ndarray:
+        """Async synthesis; the default runs synthesize_pcm on a worker thread."""
+        return await asyncio.to_thread(self.synthesize_pcm, text, language)
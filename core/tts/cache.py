@@ -0,0 +1,302 @@
+'''
+Description: Phrase-level cache for synthesized speech.
+The recruiter repeats a lot of fixed speech (greetings, follow-up prompts,
+closing lines, the company intro), and each repetition used to be a paid
+cloud request. Audio is cached by a hash of (normalized text, language,
+voice, sample rate) in two tiers:
+- a bounded in-memory LRU;
+- .npy files on disk that are opened memory-mapped, so worker processes on
+  one host share them through the page cache.
+Only phrases synthesized inside persisting(), as prewarm() does, go to disk:
+the fixed lines worth keeping, not every sentence the LLM happens to say.
+Files are written on a background thread, to a temporary name and renamed
+into place, so readers in other processes never see a partial file. The disk
+tier is bounded by max_disk_bytes; the oldest files are removed first.
+
+Pre-warm the cache with the phrases the recruiter is known to say:
+
+    python -m core.tts.cache phrases.txt --provider google --language hi-IN
+'''
+
+import argparse
+import collections
+import contextlib
+import hashlib
+import json
+import os
+import queue
+import tempfile
+import threading
+import unicodedata
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.path.join("recordings", "tts_cache")
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_DISK_BYTES = 512 * 1024 * 1024
+
+
+def normalize_text(text):
+    """Unicode NFC with whitespace collapsed, so trivially different strings share an entry."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(text, language, voice, sample_rate):
+    payload = json.dumps([normalize_text(text), language, voice, sample_rate], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, cache_dir=DEFAULT_CACHE_DIR,
+                 max_disk_bytes=DEFAULT_MAX_DISK_BYTES):
+        """
+        Args:
+            max_bytes: Size bound of the in-memory tier
+            cache_dir: Directory of the on-disk tier; None keeps the cache in memory only
+            max_disk_bytes: Size bound of the on-disk tier
+        """
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.disk_bytes = None  # Counted by the writer on its first write
+        self.local = threading.local()  # .persist is set inside persisting()
+        self.write_queue = queue.Queue()
+        self.writer_thread = None  # Started by the first write
+        self.memory = collections.OrderedDict()  # key -> read-only array, least recently used first
+        self.memory_bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.npy")
+
+    def get(self, key):
+        """Cached audio for `key`, or None."""
+        with self.lock:
+            audio = self.memory.get(key)
+            if audio is not None:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                return audio
+        if self.cache_dir is None:
+            return None
+        try:
+            audio = np.load(self.path(key), mmap_mode="r")
+        except (FileNotFoundError, ValueError):
+            return None
+        with self.lock:
+            self.disk_hits += 1
+        self.remember(key, audio)
+        return audio
+
+    def put(self, key, audio, persist=None):
+        """Cache audio and return the read-only array that was cached.
+
+        The audio goes to disk as well if `persist` is true, or by default
+        when called inside persisting().
+        """
+        audio = np.array(audio)
+        audio.setflags(write=False)
+        if persist is None:
+            persist = getattr(self.local, "persist", False)
+        if persist and self.cache_dir is not None:
+            self.submit(key, audio)
+        self.remember(key, audio)
+        return audio
+
+    @contextlib.contextmanager
+    def persisting(self):
+        """Within the block, phrases cached by this thread are also written to disk."""
+        previous = getattr(self.local, "persist", False)
+        self.local.persist = True
+        try:
+            yield self
+        finally:
+            self.local.persist = previous
+
+    def remember(self, key, audio):
+        """Add to the LRU tier, evicting the least recently used entries beyond max_bytes."""
+        if audio.nbytes > self.max_bytes:
+            return
+        with self.lock:
+            previous = self.memory.pop(key, None)
+            if previous is not None:
+                self.memory_bytes -= previous.nbytes
+            self.memory[key] = audio
+            self.memory_bytes += audio.nbytes
+            while self.memory_bytes > self.max_bytes:
+                _, evicted = self.memory.popitem(last=False)
+                self.memory_bytes -= evicted.nbytes
+
+    def submit(self, key, audio):
+        """Queue a disk write; the caller does not wait for the file system."""
+        with self.lock:
+            if self.writer_thread is None:
+                self.writer_thread = threading.Thread(target=self.writer_worker, daemon=True)
+                self.writer_thread.start()
+        self.write_queue.put((key, audio))
+
+    def writer_worker(self):
+        """Worker thread that writes queued entries and keeps the disk tier within max_disk_bytes."""
+        while True:
+            key, audio = self.write_queue.get()
+            try:
+                if self.disk_bytes is None:
+                    self.disk_bytes = sum(size for _, size, _ in self.disk_files())
+                path = self.path(key)
+                previous = os.path.getsize(path) if os.path.exists(path) else 0
+                if self.write_file(key, audio):
+                    self.disk_bytes += os.path.getsize(path) - previous
+                if self.disk_bytes > self.max_disk_bytes:
+                    self.evict_files()
+            except Exception as e:
+                print(f"TTS cache write error: {e}")
+            finally:
+                self.write_queue.task_done()
+
+    def flush(self):
+        """Wait until queued disk writes have finished."""
+        self.write_queue.join()
+
+    def disk_files(self):
+        """(path, size, mtime) of every cached file."""
+        files = []
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                if not name.endswith(".npy"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue  # Evicted by another process
+                files.append((path, stat.st_size, stat.st_mtime))
+        return files
+
+    def evict_files(self):
+        """Remove the oldest files until the disk tier is within max_disk_bytes.
+
+        Processes sharing the directory may each evict; the walk recounts what is left.
+        """
+        files = sorted(self.disk_files(), key=lambda entry: entry[2])
+        self.disk_bytes = sum(size for _, size, _ in files)
+        for path, size, _ in files:
+            if self.disk_bytes <= self.max_disk_bytes:
+                break
+            try:
+                # Readers that have it memory-mapped keep their mapping
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.disk_bytes -= size
+
+    def write_file(self, key, audio):
+        """Write one entry atomically; returns False if the write failed."""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, audio)
+            os.replace(temp_path, path)
+            return True
+        except OSError as e:
+            # The disk tier is best effort; the memory tier still has the audio
+            print(f"TTS cache write failed: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return False
+
+    def get_or_synthesize(self, text, language, voice, sample_rate, synthesize):
+        """Return cached audio for the phrase, calling `synthesize()` on a miss."""
+        key = cache_key(text, language, voice, sample_rate)
+        audio = self.get(key)
+        if audio is not None:
+            if getattr(self.local, "persist", False) and self.cache_dir is not None \
+                    and not isinstance(audio, np.memmap):
+                self.submit(key, audio)  # Only in memory so far
+            return audio
+        with self.lock:
+            self.misses += 1
+        return self.put(key, synthesize())
+
+    def stats(self):
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_entries": len(self.memory),
+                "memory_bytes": self.memory_bytes,
+                "disk_bytes": self.disk_bytes,
+            }
+
+
+default_cache_instance = None
+default_cache_lock = threading.Lock()
+
+
+def default_cache():
+    """Process-wide cache used by the TTS classes unless they are given one.
+
+    TTS_CACHE_DIR overrides the disk location; set it to an empty string to
+    keep the cache in memory only. Only persisting() blocks write to disk.
+    """
+    global default_cache_instance
+    with default_cache_lock:
+        if default_cache_instance is None:
+            cache_dir = os.getenv("TTS_CACHE_DIR", DEFAULT_CACHE_DIR) or None
+            default_cache_instance = TTSCache(cache_dir=cache_dir)
+        return default_cache_instance
+
+
+def resolve_cache(cache):
+    """Interpret a TTS class's `cache` argument: None uses default_cache(), False disables caching."""
+    return default_cache() if cache is None else cache or None
+
+
+def prewarm(tts, phrases, language):
+    """Synthesize each phrase as the units the streaming segmenter will send to TTS.
+
+    The units are persisted to the disk tier, which is waited for before returning.
+    """
+    from core.tts.segmenter import SentenceSegmenter
+    segmenter = SentenceSegmenter(language)
+    units = []
+    for phrase in phrases:
+        for unit in segmenter.split(phrase):
+            if unit not in units:
+                units.append(unit)
+    with tts.cache.persisting():
+        for i, unit in enumerate(units, 1):
+            tts.synthesize_pcm(unit, language)
+            print(f"[{i}/{len(units)}] {unit}")
+    tts.cache.flush()
+    return units
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-warm the TTS phrase cache")
+    parser.add_argument("phrases", type=str, help="text file with one phrase per line")
+    parser.add_argument("--provider", type=str, default="google", choices=["google", "polly"])
+    parser.add_argument("--language", type=str, default="hi-IN")
+    args = parser.parse_args()
+
+    with open(args.phrases, encoding="utf-8") as f:
+        phrases = [line.strip() for line in f if line.strip()]
+    if args.provider == "polly":
+        from core.tts.polly_tts import PollyTTS
+        tts = PollyTTS()
+    else:
+        from core.tts.google_tts_2 import GoogleTTS
+        tts = GoogleTTS()
+
+    prewarm(tts, phrases, args.language)
+    print(f"Cache stats: {tts.cache.stats()}")
+    tts.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,36 @@
 '''
 This is the subclass of the BaseTTS class.
 It uses the Coqui TTS model to synthesize the text.
-It will generate the audio response and save it to a file.
+It returns the audio response as PCM samples and can optionally save it to a file.
 '''
 
-from TTS.api import TTS
+import numpy as np
+from core.audio.wav_io import write_wav
 from core.tts.base_tts import BaseTTS
 
 class CoquiTTS(BaseTTS):
     def __init__(self):
-        self.model = TTS("tts_models/multilingual/multi-dataset/xtts_v2")
+        self.model = None  # Loaded by load()
         
-    def synthesize(self, text, language="hi-IN"):
-        output_path = "response.wav"
-        self.model.tts_to_file(
+    def load(self):
+        if self.model is None:
+            from TTS.api import TTS
+            self.model = TTS("tts_models/multilingual/multi-dataset/xtts_v2")
+            self.sample_rate = self.model.synthesizer.output_sample_rate
+        
+    def synthesize(self, text, language="hi-IN", output_path=None):
+        self.load()
+        audio = np.asarray(self.model.tts(
             text=text,
             speaker_wav="reference_speaker.wav",
-            language=language,
-            file_path=output_path
-        )
-        return output_path
+            language=language
+        ), dtype=np.float32)
+        if output_path:
+            write_wav(output_path, self.sample_rate, audio)
+        return audio
+
+    def synthesize_pcm(self, text, language="hi-IN"):
+        return self.synthesize(text, language)
+
+    def close(self):
+        self.model = None
@@ -0,0 +1,84 @@
+'''
+Description: Short acknowledgements ("Okay", "Hmm, I see", "ठीक है") played
+while the reply is being prepared.
+After the candidate stops talking there is silence until STT, the first LLM
+tokens and the first TTS sentence are all done. A filler starts playing as
+soon as the utterance ends and is faded out as soon as real response audio
+is ready. Fillers are synthesized once, during warm-up, through the TTS
+phrase cache, so playing one costs no API call.
+'''
+
+import random
+import time
+
+FILLER_PHRASES = {
+    "hi": ["ठीक है।", "हम्म, समझ गई।", "अच्छा।", "जी।"],
+    "en": ["Okay.", "Hmm, I see.", "Right.", "Got it."],
+}
+# TTS voice language for each filler language
+FILLER_VOICES = {"hi": "hi-IN", "en": "en-IN"}
+
+
+def language_code(language):
+    """'hi-IN' or 'hi' -> 'hi'."""
+    return language.split("-")[0].lower() if language else None
+
+
+class FillerBank:
+    def __init__(self, tts, phrases=None, default_language="hi", seed=None):
+        self.tts = tts
+        self.phrases = phrases or FILLER_PHRASES
+        self.default_language = language_code(default_language)
+        self.audio = {}  # language -> list of (phrase, audio)
+        self.random = random.Random(seed)
+        self.last_phrase = None
+
+    def load(self):
+        pass
+
+    def warmup(self):
+        """Synthesize every filler up front; the hot path never waits for TTS."""
+        for language, phrases in self.phrases.items():
+            voice_language = FILLER_VOICES.get(language, language)
+            self.audio[language] = [(phrase, self.tts.synthesize_pcm(phrase, voice_language)) for phrase in phrases]
+
+    def close(self):
+        pass
+
+    def choose(self, language=None):
+        """Pick a filler for `language` without repeating the last one; None if none are ready."""
+        language = language_code(language)
+        options = self.audio.get(language) or self.audio.get(self.default_language)
+        if not options:
+            return None
+        candidates = [option for option in options if option[0] != self.last_phrase] or options
+        phrase, audio = self.random.choice(candidates)
+        self.last_phrase = phrase
+        return {"phrase": phrase, "audio": audio, "duration": len(audio) / self.tts.sample_rate}
+
+
+class FillerTracker:
+    """Records when a filler started and whether real audio had to cut it short."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.phrase = None
+        self.ends_at = 0.0
+
+    def started(self, filler, latency, speech_end):
+        now = time.monotonic()
+        self.phrase = filler["phrase"]
+        self.ends_at = now + filler["duration"]
+        latency["filler"] = filler["phrase"]
+        latency["filler_start"] = now - speech_end
+        latency["filler_cut"] = False
+
+    def should_cut(self, latency):
+        """Call when real audio is ready; True if the filler is still playing and must be faded out."""
+        playing = self.phrase is not None and time.monotonic() < self.ends_at
+        if playing:
+            latency["filler_cut"] = True
+        self.reset()
+        return playing
@@ -4,21 +4,24 @@ Classes:
     GoogleTTS: A class that inherits from BaseTTS and provides methods to synthesize speech from text.
 Methods:
     __init__(): Initializes the GoogleTTS class and creates a TextToSpeechClient instance.
-    synthesize(text, output_path="response.wav", language="hi-IN"): Synthesizes speech from the provided text and saves it as a WAV file.
+    synthesize(text, output_path=None, language="hi-IN"): Synthesizes speech from the provided text and returns the PCM samples,
+        optionally also saving them as a WAV file.
 Usage:
     google_tts = GoogleTTS()
-    audio_file_path = google_tts.synthesize("Hello, world!", language="en-US")
+    audio = google_tts.synthesize("Hello, world!", language="en-US")
 
 """
 
-from google.cloud import texttospeech
+from core import transport
+from core.audio.wav_io import decode_wav, write_wav
 from core.tts.base_tts import BaseTTS
+from core.tts.cache import resolve_cache
 import os
 from dotenv import load_dotenv
 load_dotenv()
 
 class GoogleTTS(BaseTTS):
-    def __init__(self):
+    def __init__(self, cache=None):
         # load_dotenv() reads .env file and adds variables to os.environ
         load_dotenv()  # looks for .env file in current/parent directories
         
@@ -26,9 +29,27 @@ class GoogleTTS(BaseTTS):
         if not project_id:
             raise ValueError("Missing GOOGLE_CLOUD_PROJECT_ID in .env file")
             
-        self.client = texttospeech.TextToSpeechClient()
+        self.client = None  # Created by load()
+        self.cache = resolve_cache(cache)
+        
+    def load(self):
+        if self.client is None:
+            self.client = transport.google_tts_client()
+        
+    def synthesize(self, text, output_path=None, language="hi-IN"):
+        # Repeated phrases are served from the cache instead of the API
+        audio = self.cached_synthesis(
+            text, language, f"google:{language}-Wavenet-B", lambda: self.request_audio(text, language)
+        )
+        if output_path:
+            write_wav(output_path, self.sample_rate, audio)
+            
+        return audio
+        
+    def request_audio(self, text, language):
+        from google.cloud import texttospeech
+        self.load()
         
-    def synthesize(self, text, output_path="response.wav", language="hi-IN"):
         # Configure the voice request
         synthesis_input = texttospeech.SynthesisInput(text=text)
         
@@ -40,18 +61,26 @@ class GoogleTTS(BaseTTS):
         
         # Select the audio encoding
         audio_config = texttospeech.AudioConfig(
-            audio_encoding=texttospeech.AudioEncoding.LINEAR16
+            audio_encoding=texttospeech.AudioEncoding.LINEAR16,
+            sample_rate_hertz=self.sample_rate
         )
         
         # Perform the synthesis
+        transport.touch_google_tts_client(self.client)
         response = self.client.synthesize_speech(
             input=synthesis_input,
             voice=voice,
             audio_config=audio_config
         )
         
-        # Save the audio file
-        with open(output_path, "wb") as out:
-            out.write(response.audio_content)
-            
-        return output_path
+        # Decode in memory
+        _, audio = decode_wav(response.audio_content)
+        return audio
+        
+    def synthesize_pcm(self, text, language="hi-IN"):
+        return self.synthesize(text, language=language)
+
+    def close(self):
+        if self.client is not None:
+            transport.close_google_tts_client(self.client)
+            self.client = None
@@ -3,30 +3,35 @@ GoogleTTS: Text-to-speech synthesis using Google Cloud's Text-to-Speech API with
 
 Attributes:
     client: Google Cloud Text-to-Speech client
-    temp_dir: Directory for temporary audio files
 
 Methods:
     synthesize(text, language="hi-IN", voice_gender="FEMALE", output_path=None):
         Synthesizes speech from text using specified language and voice parameters.
 """
 
-import os
-import tempfile
 import logging
-from google.cloud import texttospeech
-from google.api_core import retry
+from core import transport
+from core.audio.wav_io import decode_wav, write_wav
 from core.tts.base_tts import BaseTTS
+from core.tts.cache import resolve_cache
 
 class GoogleTTS(BaseTTS):
-    def __init__(self):
+    def __init__(self, cache=None):
+        self.client = None  # Created by load()
+        self.cache = resolve_cache(cache)
+    
+    def load(self):
+        if self.client is not None:
+            return
+        from google.api_core import retry
         try:
-            self.client = texttospeech.TextToSpeechClient()
-            self.temp_dir = tempfile.mkdtemp()
+            self.client = transport.google_tts_client()
         except Exception as e:
             logging.error(f"Failed to initialize Google TTS: {str(e)}")
             raise
+        # Transient API errors are retried with backoff
+        self.synthesize_speech = retry.Retry()(self.client.synthesize_speech)
     
-    @retry.Retry()
     def synthesize(self, text, language="hi-IN", voice_gender="FEMALE", output_path=None):
         """
         Synthesize text to speech using Google Cloud TTS.
@@ -35,47 +40,55 @@ class GoogleTTS(BaseTTS):
             text: Text to synthesize
             language: Language code (e.g. "hi-IN", "en-US")
             voice_gender: Voice gender ("FEMALE" or "MALE")
-            output_path: Optional custom output path
+            output_path: Optional path to also write the audio to as a WAV file
             
         Returns:
-            str: Path to the generated audio file
+            np.ndarray: int16 PCM samples at `sample_rate`
         """
-        try:
+        from google.cloud import texttospeech
+        self.load()
+        voice_name = f"{language}-Wavenet-B"
+        
+        def request():
             synthesis_input = texttospeech.SynthesisInput(text=text)
             
             voice = texttospeech.VoiceSelectionParams(
                 language_code=language,
-                name=f"{language}-Wavenet-B",
+                name=voice_name,
                 ssml_gender=getattr(texttospeech.SsmlVoiceGender, voice_gender)
             )
             
             audio_config = texttospeech.AudioConfig(
                 audio_encoding=texttospeech.AudioEncoding.LINEAR16,
+                sample_rate_hertz=self.sample_rate,
                 speaking_rate=1.0
             )
             
-            response = self.client.synthesize_speech(
+            transport.touch_google_tts_client(self.client)
+            response = self.synthesize_speech(
                 input=synthesis_input,
                 voice=voice,
                 audio_config=audio_config
             )
             
-            if not output_path:
-                output_path = os.path.join(self.temp_dir, f"response_{os.getpid()}.wav")
-                
-            with open(output_path, "wb") as out:
-                out.write(response.audio_content)
-                
-            return output_path
+            _, audio = decode_wav(response.audio_content)
+            return audio
+        
+        try:
+            # The voice name fixes the gender, so it alone identifies the voice
+            audio = self.cached_synthesis(text, language, f"google:{voice_name}", request)
+            if output_path:
+                write_wav(output_path, self.sample_rate, audio)
+            return audio
             
         except Exception as e:
             logging.error(f"Speech synthesis failed: {str(e)}")
             raise
 
-    def __del__(self):
-        """Cleanup temporary files on object destruction"""
-        try:
-            import shutil
-            shutil.rmtree(self.temp_dir, ignore_errors=True)
-        except:
-            pass
\ No newline at end of file
+    def synthesize_pcm(self, text, language="hi-IN"):
+        return self.synthesize(text, language)
+
+    def close(self):
+        if self.client is not None:
+            transport.close_google_tts_client(self.client)
+            self.client = None
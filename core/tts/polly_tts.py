@@ -7,29 +7,64 @@ Attributes:
 Methods:
     __init__():
         Initializes the PollyTTS class and sets up the Polly client.
-    synthesize(text, language="hi-IN"):
+    synthesize(text, language="hi-IN", output_path=None):
         Synthesizes speech from the given text using Amazon Polly.
-        Saves the synthesized speech as an MP3 file.
+        Requests raw 16-bit PCM, optionally also saving it as a WAV file.
         Args:
             text (str): The text to be synthesized.
             language (str): The language code for the voice to be used. Defaults to "hi-IN".
+            output_path (str): Optional path to write the audio to.
         Returns:
-            str: The filename of the saved MP3 file.
+            np.ndarray: int16 PCM samples at 16 kHz.
 """
 
-import boto3
+from core import transport
+from core.audio.wav_io import decode_pcm16, write_wav
 from core.tts.base_tts import BaseTTS
+from core.tts.cache import resolve_cache
 
 class PollyTTS(BaseTTS):
-    def __init__(self):
-        self.client = boto3.client("polly", region_name="ap-south-1")
+    # Highest rate Polly supports for PCM output
+    sample_rate = 16000
+
+    def __init__(self, cache=None):
+        self.client = None  # Created by load()
+        self.cache = resolve_cache(cache)
+        
+    def load(self):
+        if self.client is None:
+            self.client = transport.boto3_client("polly", "ap-south-1")
+            # Keep the pooled HTTPS connection open between turns
+            transport.keepalive().register(f"polly-{id(self)}", self.ping)
         
-    def synthesize(self, text, language="hi-IN"):
+    def ping(self):
+        self.client.describe_voices(LanguageCode="hi-IN")
+        
+    def synthesize(self, text, language="hi-IN", output_path=None):
+        voice_id = "Aditi" if language == "hi-IN" else "Raveena"
+        audio = self.cached_synthesis(
+            text, language, f"polly:{voice_id}", lambda: self.request_audio(text, voice_id)
+        )
+        if output_path:
+            write_wav(output_path, self.sample_rate, audio)
+        return audio
+
+    def request_audio(self, text, voice_id):
+        self.load()
+        transport.keepalive().touch(f"polly-{id(self)}")
         response = self.client.synthesize_speech(
-            OutputFormat="mp3",
+            OutputFormat="pcm",
+            SampleRate=str(self.sample_rate),
             Text=text,
-            VoiceId="Aditi" if language == "hi-IN" else "Raveena"
+            VoiceId=voice_id
         )
-        with open("response.mp3", "wb") as f:
-            f.write(response["AudioStream"].read())
-        return "response.mp3"
+        return decode_pcm16(response["AudioStream"].read())
+
+    def synthesize_pcm(self, text, language="hi-IN"):
+        return self.synthesize(text, language)
+
+    def close(self):
+        if self.client is not None:
+            transport.keepalive().unregister(f"polly-{id(self)}")
+            self.client.close()
+            self.client = None
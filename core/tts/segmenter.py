@@ -0,0 +1,299 @@
+'''
+Description: Streaming sentence/clause segmenter between the LLM and TTS.
+LLM text arrives a few characters at a time. The segmenter buffers it and
+emits a unit for synthesis as soon as a sentence boundary is seen. To cut
+time to first audio, the first unit of a response may end at a clause
+boundary. Long clauses are flushed at a word boundary once they exceed
+max_chars or have been buffered for longer than max_latency seconds.
+Boundary rules (terminators, abbreviations) are tunable per language.
+
+The latency flush must not wait for the next chunk, which may be seconds
+away when the model stalls. DeadlineReader and awith_deadlines() wrap the
+LLM stream and yield None whenever the segmenter's deadline passes first, so
+the consumer can call poll() in time.
+'''
+
+import asyncio
+import contextlib
+import queue
+import threading
+import time
+
+SEGMENTER_PROFILES = {
+    "en": {
+        "sentence_end": ".!?",
+        "clause_end": ",;:",
+        "abbreviations": {
+            "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "etc", "e.g", "i.e",
+            "inc", "ltd", "co", "corp", "dept", "approx", "no", "fig", "jan", "feb", "mar",
+            "apr", "jun", "jul", "aug", "sep", "sept", "oct", "nov", "dec",
+        },
+    },
+    "hi": {
+        # Danda and double danda end sentences; models also emit Latin punctuation in Hindi
+        "sentence_end": "।॥.!?",
+        "clause_end": ",;:",
+        "abbreviations": {"डॉ", "श्री", "श्रीमती", "सुश्री", "प्रो", "कु", "mr", "mrs", "ms", "dr", "etc"},
+    },
+}
+DEFAULT_PROFILE = "en"
+# Terminators that are never part of a number or abbreviation
+UNAMBIGUOUS_ENDS = "।॥"
+CLOSING_CHARS = "\"')]”’"
+DONE = object()
+
+
+class SentenceSegmenter:
+    def __init__(self, language="en", first_unit_min_chars=12, max_chars=200, max_latency=1.0):
+        self.first_unit_min_chars = first_unit_min_chars
+        self.max_chars = max_chars
+        self.max_latency = max_latency
+        self.reset(language)
+
+    def reset(self, language=None):
+        """Start a new response, optionally switching language profile."""
+        if language is not None:
+            self.language = language
+            code = language.split("-")[0].lower()
+            self.profile = SEGMENTER_PROFILES.get(code, SEGMENTER_PROFILES[DEFAULT_PROFILE])
+        self.buffer = ""
+        self.buffer_since = None
+        self.units_emitted = 0
+
+    def push(self, text, now=None):
+        """Add streamed text and return the units that are ready for synthesis."""
+        if not text:
+            return []
+        now = time.monotonic() if now is None else now
+        if not self.buffer:
+            self.buffer_since = now
+        self.buffer += text
+        units = []
+        while True:
+            end = self.find_boundary()
+            if end is None:
+                break
+            self.emit(end, units, now)
+        units.extend(self.poll(now))
+        return units
+
+    def poll(self, now=None):
+        """Flush a long-pending clause once it exceeds max_chars or max_latency."""
+        if not self.buffer.strip():
+            return []
+        now = time.monotonic() if now is None else now
+        too_long = len(self.buffer) >= self.max_chars
+        too_slow = self.max_latency is not None and now - self.buffer_since >= self.max_latency
+        if not (too_long or too_slow):
+            return []
+        end = self.last_clause_boundary() or self.last_word_boundary()
+        if end is None:
+            return []
+        units = []
+        self.emit(end, units, now)
+        return units
+
+    def deadline(self):
+        """Monotonic time at which max_latency runs out for the buffered text, or None."""
+        if self.max_latency is None or not self.buffer.strip():
+            return None
+        return self.buffer_since + self.max_latency
+
+    def flush(self):
+        """End of stream: return whatever is left as a final unit."""
+        units = []
+        if self.buffer.strip():
+            units.append(self.buffer.strip())
+            self.units_emitted += 1
+        self.buffer = ""
+        self.buffer_since = None
+        return units
+
+    def split(self, text):
+        """Segment a complete piece of text in one go."""
+        self.reset()
+        # No latency flushes: the whole text is already available
+        self.buffer_since = now = time.monotonic()
+        self.buffer = text
+        units = []
+        while True:
+            end = self.find_boundary()
+            if end is None:
+                break
+            self.emit(end, units, now)
+        return units + self.flush()
+
+    def emit(self, end, units, now):
+        unit = self.buffer[:end].strip()
+        self.buffer = self.buffer[end:]
+        self.buffer_since = now if self.buffer else None
+        if unit:
+            units.append(unit)
+            self.units_emitted += 1
+
+    def find_boundary(self):
+        """Index just past the first boundary in the buffer, or None."""
+        text = self.buffer
+        first_unit = self.units_emitted == 0
+        for i, ch in enumerate(text):
+            if ch in self.profile["sentence_end"]:
+                end = self.boundary_end(i)
+                if end is not None and self.is_sentence_end(i):
+                    return end
+            elif first_unit and ch in self.profile["clause_end"] and self.first_unit_min_chars is not None \
+                    and i + 1 >= self.first_unit_min_chars:
+                end = self.boundary_end(i)
+                if end is not None and not self.is_digit_separator(i):
+                    return end
+        return None
+
+    def boundary_end(self, i):
+        """End of the boundary at i, including closing quotes; None until whitespace follows."""
+        text = self.buffer
+        j = i + 1
+        while j < len(text) and (text[j] in CLOSING_CHARS or text[j] in self.profile["sentence_end"]):
+            j += 1
+        if text[i] in UNAMBIGUOUS_ENDS:
+            return j
+        if j < len(text) and text[j].isspace():
+            return j
+        return None
+
+    def is_digit_separator(self, i):
+        text = self.buffer
+        return 0 < i < len(text) - 1 and text[i - 1].isdigit() and text[i + 1].isdigit()
+
+    def is_sentence_end(self, i):
+        """Rule out abbreviations, initials and decimal points before a '.'."""
+        text = self.buffer
+        if text[i] != '.':
+            return True
+        if self.is_digit_separator(i):
+            return False
+        start = i
+        while start > 0 and not text[start - 1].isspace():
+            start -= 1
+        word = text[start:i].strip(CLOSING_CHARS + "(\"'").lower()
+        if word in self.profile["abbreviations"]:
+            return False
+        # Single-letter initials such as "J. Smith"
+        return not (len(word) == 1 and word.isalpha())
+
+    def last_clause_boundary(self):
+        text = self.buffer
+        for i in range(len(text) - 1, -1, -1):
+            if text[i] in self.profile["clause_end"] and i + 1 < len(text) and text[i + 1].isspace():
+                return i + 1
+        return None
+
+    def last_word_boundary(self):
+        i = self.buffer.rstrip().rfind(" ")
+        return i if i > 0 else None
+
+
+def wait_time(segmenter, polled):
+    """Seconds until the segmenter should be polled, or None to wait for the next chunk."""
+    deadline = segmenter.deadline()
+    if deadline is None or deadline == polled:
+        # Nothing buffered, or poll() found no word boundary to flush at
+        return None, deadline
+    return max(0.0, deadline - time.monotonic()), deadline
+
+
+class DeadlineReader:
+    """Iterate over `chunks`, with None whenever segmenter.poll() is due first.
+
+    The stream is read on a background thread. close() stops the reader at
+    its next chunk without waiting for it, since a stalled stream may not
+    produce one for a long time. Work that must follow whatever the stream
+    does on close (e.g. saving the reply) is passed to after_close(), and
+    join() waits for the reader to finish.
+    """
+
+    def __init__(self, chunks, segmenter):
+        self.chunks = chunks
+        self.segmenter = segmenter
+        self.items = queue.Queue()
+        self.stopped = threading.Event()
+        self.lock = threading.Lock()
+        self.closed = False  # Set once `chunks` has been closed
+        self.callbacks = []
+        self.reader = threading.Thread(target=self.read, daemon=True)
+        self.reader.start()
+
+    def read(self):
+        try:
+            for chunk in self.chunks:
+                if self.stopped.is_set():
+                    break
+                self.items.put(chunk)
+        except Exception as e:
+            self.items.put(e)
+        finally:
+            self.chunks.close()
+            with self.lock:
+                self.closed = True
+                callbacks, self.callbacks = self.callbacks, []
+            for callback in callbacks:
+                callback()
+            self.items.put(DONE)
+
+    def __iter__(self):
+        polled = None
+        while not self.stopped.is_set():
+            timeout, deadline = wait_time(self.segmenter, polled)
+            try:
+                item = self.items.get(timeout=timeout)
+            except queue.Empty:
+                polled = deadline
+                yield None
+                continue
+            if item is DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def close(self):
+        self.stopped.set()
+
+    def after_close(self, callback):
+        """Call `callback` once `chunks` has been closed; right away if it already has."""
+        with self.lock:
+            if not self.closed:
+                self.callbacks.append(callback)
+                return
+        callback()
+
+    def join(self, timeout=None):
+        self.reader.join(timeout)
+
+
+async def awith_deadlines(chunks, segmenter):
+    """Async counterpart of DeadlineReader for an async generator.
+
+    The caller still closes `chunks`; a read in progress is cancelled first.
+    """
+    pending = None
+    polled = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(chunks.__anext__())
+            timeout, deadline = wait_time(segmenter, polled)
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if not done:
+                polled = deadline
+                yield None
+                continue
+            task, pending = pending, None
+            try:
+                chunk = task.result()
+            except StopAsyncIteration:
+                return
+            yield chunk
+    finally:
+        if pending is not None:
+            pending.cancel()
+            with contextlib.suppress(asyncio.CancelledError, StopAsyncIteration):
+                await pending
@@ -3,39 +3,109 @@ This module provides a streaming version of the GoogleTTS class that can handle
 sentence-by-sentence synthesis for real-time audio playback.
 """
 
-import os
-import re
 import queue
 import threading
-import sounddevice as sd
-from google.cloud import texttospeech
+import collections
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+from core import transport
+from core.audio.audio_engine import AudioEngine
+from core.audio.barge_in import BargeInDetector, PlaybackReference
+from core.audio.pcm import to_mono_float32
+from core.audio.playback import PlaybackBuffer
+from core.audio.wav_io import decode_wav
 from core.tts.base_tts import BaseTTS
-from scipy.io import wavfile
-import numpy as np
-import tempfile
+from core.tts.cache import resolve_cache
+from core.tts.segmenter import SentenceSegmenter
 
 class StreamingGoogleTTS(BaseTTS):
-    def __init__(self):
-        self.client = texttospeech.TextToSpeechClient()
+    def __init__(self, audio_engine: AudioEngine = None, max_workers=3, lookahead=4, cache=None):
+        self.client = None  # Created by load()
+        self.cache = resolve_cache(cache)
         self.audio_queue = queue.Queue()
+        
+        # Sentences are synthesized in parallel but delivered to audio_queue in order.
+        # At most `lookahead` requests are in flight; the rest wait in `pending`.
+        self.synthesis_pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tts")
+        self.lookahead = lookahead
+        self.pending = collections.deque()
+        self.pending_condition = threading.Condition()
+        self.outstanding = 0  # Sentences of the current generation queued but not yet handed to the player
+        # Bumped by cancel_synthesis(); sentences of older generations no longer count as outstanding
+        self.generation = 0
+        self.delivery_thread = None
         self.is_playing = False
         self.is_interrupted = False
         self.playback_thread = None
         self.interrupt_event = threading.Event()
-        self.fs = 24000  # Standard sample rate for Google TTS
+        self.fs = self.sample_rate  # Standard sample rate for Google TTS
+        
+        # Playback and interrupt detection share one always-open engine, started by load()
+        self.audio_engine = audio_engine or AudioEngine(output_rate=self.fs)
+        self.player = PlaybackBuffer()
+        self.audio_engine.add_output_source(self.player)
         
-        # Set up interrupt detection
-        self.silence_threshold = 0.1
-        self.interrupt_detector = None
+        # A filler plays until the first real sentence is ready, then fades out
+        self.filler_until = 0.0
+        self.filler_cut = False
+        
+        # Set up interrupt detection, referenced against what the speaker is playing.
+        # The reference is added after the player so it sees the mixed output.
+        self.reference = PlaybackReference()
+        self.audio_engine.add_output_source(self.reference)
+        self.barge_in = BargeInDetector(
+            self.reference, sample_rate=self.audio_engine.input_rate, on_barge_in=self.on_barge_in
+        )
+        self.is_detecting = False
         
-    def split_into_sentences(self, text):
-        """Split text into sentences for streaming synthesis."""
-        # Simple sentence splitting on common punctuation
-        sentences = re.split(r'(?<=[.!?])\s+', text)
-        return [s.strip() for s in sentences if s.strip()]
+        # Sentences of the current response in playback order, to work out what was heard
+        self.spoken = []
+        self.sentence_ids = itertools.count()
+        # Synthesis requests of the current response: {"text", "start", "end"} in monotonic seconds
+        self.requests = []
+        
+    def load(self):
+        """Create the API client and start the audio engine's streams. Idempotent."""
+        self.audio_engine.start()
+        if self.client is None:
+            self.client = transport.google_tts_client()
+        
+    def split_into_sentences(self, text, language="hi-IN"):
+        """Split text into sentences for streaming synthesis.
+        
+        Units from the pipeline's segmenter arrive already cut, so only
+        sentence boundaries split them further: the first-unit clause split
+        has been applied once, upstream.
+        """
+        return SentenceSegmenter(language, first_unit_min_chars=None, max_latency=None).split(text)
         
     def synthesize_sentence(self, text, language="hi-IN"):
         """Synthesize a single sentence and return the audio data."""
+        # Cache hits return immediately, so they start playing without a round trip
+        return self.cached_synthesis(
+            text, language, f"google:{language}-Wavenet-B", lambda: self.request_audio(text, language)
+        )
+        
+    def timed_synthesis(self, text, language):
+        """synthesize_sentence, recording the request in `requests`."""
+        start = time.monotonic()
+        audio = self.synthesize_sentence(text, language)
+        self.requests.append({"text": text, "start": start, "end": time.monotonic()})
+        return audio
+        
+    def playback_timeline(self):
+        """Sentences of the current response that reached the speaker: {"text", "start", "end"}."""
+        timeline = []
+        for sentence in self.spoken:
+            span = self.player.played_between(sentence["id"])
+            if span is not None:
+                timeline.append({"text": sentence["text"], "start": span[0], "end": span[1]})
+        return timeline
+        
+    def request_audio(self, text, language):
+        from google.cloud import texttospeech
+        self.load()
         synthesis_input = texttospeech.SynthesisInput(text=text)
         
         voice = texttospeech.VoiceSelectionParams(
@@ -48,99 +118,230 @@ class StreamingGoogleTTS(BaseTTS):
             sample_rate_hertz=self.fs
         )
         
+        transport.touch_google_tts_client(self.client)
         response = self.client.synthesize_speech(
             input=synthesis_input,
             voice=voice,
             audio_config=audio_config
         )
         
-        # Save to temporary file and read as numpy array
-        with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_file:
-            temp_file.write(response.audio_content)
-            temp_file.flush()
-            _, audio_data = wavfile.read(temp_file.name)
-        
-        os.unlink(temp_file.name)
+        # LINEAR16 responses are WAV bytes; view the samples in place
+        _, audio_data = decode_wav(response.audio_content)
         return audio_data
         
-    def detect_interrupt(self, indata, frames, time, status):
-        """Callback for interrupt detection."""
-        if status:
-            print(f'Interrupt detection status: {status}')
-        if np.max(np.abs(indata)) > self.silence_threshold:
-            self.interrupt_event.set()
+    def synthesize_pcm(self, text, language="hi-IN"):
+        return self.synthesize_sentence(text, language)
+        
+    def play_filler(self, audio):
+        """Play a short acknowledgement now; it is faded out when the first sentence arrives."""
+        self.start_interrupt_detection()
+        self.player.push(to_mono_float32(audio, self.fs))
+        self.filler_until = time.monotonic() + len(audio) / self.fs
+        self.filler_cut = False
+        
+    def on_barge_in(self):
+        """Called from the input callback when the candidate starts talking over playback."""
+        self.interrupt_event.set()
+        # Cut playback at the next output block rather than waiting for the worker
+        self.player.clear()
             
     def start_interrupt_detection(self):
         """Start listening for interruptions."""
-        self.interrupt_event.clear()
-        self.interrupt_detector = sd.InputStream(
-            channels=1,
-            samplerate=16000,
-            callback=self.detect_interrupt,
-            device=1  # Use the same device as recording
-        )
-        self.interrupt_detector.start()
+        if not self.is_detecting:
+            # A no-op once load() has run; cached audio can play before the client exists
+            self.audio_engine.start()
+            self.interrupt_event.clear()
+            self.barge_in.reset()
+            self.audio_engine.add_input_listener(self.barge_in.listen)
+            self.is_detecting = True
         
     def stop_interrupt_detection(self):
-        """Stop listening for interruptions."""
-        if self.interrupt_detector:
-            self.interrupt_detector.stop()
-            self.interrupt_detector.close()
-            self.interrupt_detector = None
+        """Stop listening for interruptions, and stop forwarding audio to the recorder."""
+        if self.is_detecting:
+            self.audio_engine.remove_input_listener(self.barge_in.listen)
+            self.is_detecting = False
+            
+    def barged_in(self):
+        """True if the candidate interrupted and their speech is waiting for take_barge_in()."""
+        return self.is_detecting and self.barge_in.onset_sample is not None
+        
+    def take_barge_in(self, listener):
+        """Hand the audio captured since the candidate interrupted, and everything after it, to `listener`.
+        
+        Returns:
+            bool: True if there was an interruption to hand over. Blocks keep
+            flowing to `listener` until stop_interrupt_detection().
+        """
+        return self.is_detecting and self.barge_in.take(listener)
+        
+    def heard_text(self):
+        """Text of the current response up to where playback stopped.
+        
+        Within the sentence that was cut off, words are assumed to be evenly
+        spread over its audio.
+        """
+        # Frames still in the output stream's buffer had not been heard yet
+        unheard = int(self.audio_engine.output_latency * self.fs)
+        heard = max(0, sum(self.player.played(sentence["id"]) for sentence in self.spoken) - unheard)
+        words = []
+        for sentence in self.spoken:
+            if heard <= 0:
+                break
+            sentence_words = sentence["text"].split()
+            words += sentence_words[:round(len(sentence_words) * min(1.0, heard / sentence["frames"]))]
+            heard -= sentence["frames"]
+        return " ".join(words)
         
     def playback_worker(self):
-        """Worker thread for continuous audio playback."""
+        """Worker thread that moves synthesized sentences into the playback buffer."""
         try:
-            while self.is_playing and not self.is_interrupted:
+            while self.is_playing:
                 try:
-                    audio_data = self.audio_queue.get(timeout=1.0)
-                    
-                    # Start interrupt detection before playing
-                    self.start_interrupt_detection()
-                    
-                    # Play audio
-                    sd.play(audio_data, self.fs)
-                    
-                    # Wait for playback to finish or interrupt
-                    while sd.get_stream().active and not self.interrupt_event.is_set():
-                        sd.sleep(100)
-                    
-                    # If interrupted, stop playback
-                    if self.interrupt_event.is_set():
-                        sd.stop()
-                        self.is_interrupted = True
-                        print("\nInterrupted by user")
-                        break
-                    
-                    # Stop interrupt detection after sentence
-                    self.stop_interrupt_detection()
-                    
+                    text, audio_data, generation = self.audio_queue.get(timeout=0.02)
+                    # Audio of a cancelled response can still arrive after the queue was drained
+                    if not self.is_interrupted and generation == self.generation:
+                        if time.monotonic() < self.filler_until:
+                            self.player.fade_out()
+                            self.filler_cut = True
+                        self.filler_until = 0.0
+                        pcm = to_mono_float32(audio_data, self.fs)
+                        sentence = {"id": next(self.sentence_ids), "text": text, "frames": len(pcm)}
+                        self.spoken.append(sentence)
+                        self.player.push(pcm, label=sentence["id"])
+                    self.sentence_done(generation)
                 except queue.Empty:
-                    continue
+                    pass
                 except Exception as e:
                     print(f"Playback error: {e}")
                     break
+                
+                if self.interrupt_event.is_set() and not self.is_interrupted:
+                    self.is_interrupted = True
+                    self.player.clear()
+                    self.cancel_synthesis()
+                    # Detection keeps capturing so the recorder can take the candidate's speech
+                    print("\nInterrupted by user")
         finally:
             self.stop_interrupt_detection()
                 
+    def delivery_worker(self):
+        """Worker thread that hands finished syntheses to the playback queue in order."""
+        while self.is_playing:
+            with self.pending_condition:
+                self.pending_condition.wait_for(lambda: self.pending or not self.is_playing)
+                if not self.is_playing:
+                    break
+                # Keep up to `lookahead` requests in flight
+                for item in list(self.pending)[:self.lookahead]:
+                    if item["future"] is None:
+                        item["future"] = self.synthesis_pool.submit(
+                            self.timed_synthesis, item["text"], item["language"]
+                        )
+                head = self.pending[0]
+            
+            try:
+                audio_data = head["future"].result()
+            except CancelledError:
+                audio_data = None
+            except Exception as e:
+                print(f"Synthesis error: {e}")
+                audio_data = None
+            
+            with self.pending_condition:
+                # The queue may have been cancelled while we were waiting
+                if not self.pending or self.pending[0] is not head:
+                    continue
+                self.pending.popleft()
+                self.pending_condition.notify_all()
+            if audio_data is not None and not self.is_interrupted:
+                self.audio_queue.put((head["text"], audio_data, head["generation"]))
+            else:
+                self.sentence_done(head["generation"])
+                
+    def sentence_done(self, generation):
+        """Mark one queued sentence of `generation` as played or dropped."""
+        with self.pending_condition:
+            if generation == self.generation:
+                self.outstanding -= 1
+                
+    def cancel_synthesis(self):
+        """Drop queued sentences and cancel requests that have not started yet.
+        
+        Requests already sent to the API cannot be aborted; their results are discarded.
+        """
+        with self.pending_condition:
+            for item in self.pending:
+                if item["future"] is not None:
+                    item["future"].cancel()
+            self.pending.clear()
+            # Sentences already with the workers belong to the old generation and are not counted
+            self.generation += 1
+            self.outstanding = 0
+            self.pending_condition.notify_all()
+        while not self.audio_queue.empty():
+            self.audio_queue.get_nowait()
+            
     def start_playback(self):
         """Start the audio playback thread."""
+        # Interruption state belongs to the response and is cleared by begin_response()
+        self.audio_engine.start()
         self.is_playing = True
-        self.is_interrupted = False
         self.playback_thread = threading.Thread(target=self.playback_worker)
         self.playback_thread.start()
+        self.delivery_thread = threading.Thread(target=self.delivery_worker, daemon=True)
+        self.delivery_thread.start()
         
     def stop_playback(self):
         """Stop the audio playback thread."""
         self.is_playing = False
+        self.cancel_synthesis()
         if self.playback_thread:
             self.playback_thread.join()
             self.playback_thread = None
+        if self.delivery_thread:
+            self.delivery_thread.join()
+            self.delivery_thread = None
+        self.player.clear()
+        self.stop_interrupt_detection()
+        
+    def begin_response(self):
+        """Clear a previous interruption before streaming a new response.
+        
+        If the candidate started talking over the filler, the new response
+        starts out interrupted: their speech stays with the detector for the
+        next turn to take, and synthesize() returns False straight away.
+        """
+        self.cancel_synthesis()
+        self.spoken = []
+        self.requests = []
+        self.player.forget()
+        if self.barged_in():
+            self.is_interrupted = True
+            return
+        # A detector still running for the filler has heard no speech and keeps listening
+        self.is_interrupted = False
+        self.interrupt_event.clear()
+        
+    def wait_for_playback(self):
+        """Block until everything queued has been played or playback was interrupted.
+        
+        Returns:
+            bool: True if completed normally, False if interrupted
+        """
+        # A barge-in clears the player at once, before the worker marks the interruption
+        while not (self.is_interrupted or self.interrupt_event.is_set()):
+            # Sentences reach the player before they stop counting as outstanding
+            if self.outstanding == 0 and self.player.idle.is_set():
+                break
+            self.interrupt_event.wait(0.02)
+        if self.is_interrupted or self.interrupt_event.is_set():
+            return False
         self.stop_interrupt_detection()
+        return True
         
     def synthesize(self, text, language="hi-IN"):
         """
-        Stream the synthesis of text sentence by sentence.
+        Queue text for synthesis sentence by sentence without blocking the caller.
         
         Args:
             text: Text to synthesize
@@ -152,18 +353,32 @@ class StreamingGoogleTTS(BaseTTS):
         # Start playback thread if not already running
         if not self.is_playing:
             self.start_playback()
+        if self.is_interrupted:
+            return False
+        # Listen from the first queued sentence until the response has finished playing
+        self.start_interrupt_detection()
         
-        # Split text into sentences and synthesize each one
-        sentences = self.split_into_sentences(text)
-        for sentence in sentences:
-            if sentence and not self.is_interrupted:
-                audio_data = self.synthesize_sentence(sentence, language)
-                self.audio_queue.put(audio_data)
-            elif self.is_interrupted:
-                break
+        # Queue each sentence; synthesis runs on the worker pool while earlier sentences play
+        with self.pending_condition:
+            for sentence in self.split_into_sentences(text, language):
+                self.pending.append(
+                    {"text": sentence, "language": language, "future": None, "generation": self.generation}
+                )
+                self.outstanding += 1
+            self.pending_condition.notify_all()
         
         return not self.is_interrupted
         
+    def close(self):
+        """Stop playback, shut down the synthesis workers and detach from the audio engine."""
+        self.stop_playback()
+        self.synthesis_pool.shutdown(wait=False, cancel_futures=True)
+        self.audio_engine.remove_output_source(self.player)
+        self.audio_engine.remove_output_source(self.reference)
+        if self.client is not None:
+            transport.close_google_tts_client(self.client)
+            self.client = None
+        
     def __del__(self):
         """Cleanup on object destruction."""
         self.stop_playback() 
\ No newline at end of file
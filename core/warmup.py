@@ -0,0 +1,45 @@
+'''
+Description: Startup warm-up for pipeline components.
+Constructors only store configuration. Models and API clients are created in
+load(), and warmup() also runs a dummy utterance or synthesis, so kernel
+initialization, tokenizer loading and connection setup happen before the
+first candidate speaks. BackgroundWarmup does this on a thread while the
+rest of the pipeline starts up.
+'''
+
+import threading
+import time
+
+
+def warm_up(*components):
+    """Load and warm each STT/LLM/TTS component in turn, logging how long each took."""
+    for component in components:
+        start = time.time()
+        try:
+            component.warmup()
+        except Exception as e:
+            # The first real turn will load the component again and surface the error
+            print(f"Warm-up of {type(component).__name__} failed: {e}")
+            continue
+        print(f"{type(component).__name__} warm in {time.time() - start:.2f}s")
+
+
+class BackgroundWarmup:
+    def __init__(self, *components):
+        self.components = components
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def run(self):
+        try:
+            warm_up(*self.components)
+        finally:
+            self.done.set()
+
+    def wait(self, timeout=None):
+        """Block until warm-up has finished; returns False on timeout."""
+        return self.done.wait(timeout)